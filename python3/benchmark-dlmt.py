@@ -0,0 +1,532 @@
+import argparse
+import io
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import tracemalloc
+import urllib.request
+from fractions import Fraction
+from random import choice, randint, seed
+from time import sleep, time
+
+import dlmt
+
+dlmt.check_python_version()
+
+import dlmt.binary
+import dlmt.cli
+import dlmt.pipeline
+import dlmt.raster
+import dlmt.rendercache
+import dlmt.server
+import dlmt.synthetic
+import dlmt.vectorized
+from dlmt.pipeline import read_source, write_contents
+
+scriptdir = os.path.dirname(os.path.abspath(__file__))
+
+example_file = os.path.join(scriptdir, "..", "examples", "one.dlmt")
+
+def load_example()->dlmt.DalmatianMedia:
+    with open(example_file, 'r') as dlmtfile:
+        return dlmt.DalmatianMedia.from_string(dlmtfile.read())
+
+def create_synthetic_media(count: int)->dlmt.DalmatianMedia:
+    seed(count)
+    media = load_example()
+    angles = [Fraction(0), Fraction(1, 8), Fraction(1, 4), Fraction(1, 3), Fraction(1, 2)]
+    scales = [Fraction(1), Fraction(1, 2), Fraction(2)]
+    brushstrokes = [dlmt.DlmtBrushstroke(brushid = "i:1", xy = dlmt.V2d(Fraction(randint(0, 1000), 1000), Fraction(randint(0, 1000), 1000)), scale = choice(scales), angle = choice(angles), tags = ["i:1"]) for _ in range(count)]
+    return media.set_brushstrokes(brushstrokes)
+
+brush_paths = [
+    "[ M -1/3 1/3,L 0 0,L 1/3 1/3,L 1/3 -1/3,L -1/3 -1/3 ]",
+    "[ M -1/2 0,C -1/2 1/2 1/2 1/2 1/2 0,S 0 -1/2 -1/2 0,Z ]",
+    "[ M -1/4 -1/4,Q 0 1/2 1/4 -1/4,T 0 -1/3,L -1/5 -1/6,Z ]"
+]
+
+def polygon_brush_path(count: int)->str:
+    points = [dlmt.V2d.from_amplitude_angle(Fraction(2, 5), Fraction(i, count)) for i in range(count)]
+    segments = ["M {}".format(points[0])] + ["L {}".format(point) for point in points[1:]] + ["Z"]
+    return "[ {} ]".format(",".join(segments))
+
+def legacy_rotate(vpath: dlmt.VPath, angle: Fraction)->dlmt.VPath:
+    # four uncached trigonometric evaluations per point, as before the rotation matrix was introduced
+    cosFract = dlmt.cosFract.__wrapped__
+    sinFract = dlmt.sinFract.__wrapped__
+    def rotate_point(pt):
+        if pt is None:
+            return None
+        return dlmt.V2d(pt.x*cosFract(angle) - pt.y*sinFract(angle), pt.x*sinFract(angle) + pt.y*cosFract(angle))
+    return dlmt.VPath([dlmt.VSegment(segment.action, rotate_point(segment.pt), rotate_point(segment.pt1), rotate_point(segment.pt2)) for segment in vpath.segments])
+
+def timeit(fn, repeat: int)->float:
+    best = None
+    for _ in range(repeat):
+        started = time()
+        fn()
+        elapsed = time() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def peak_memory(fn)->int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def report_memory(name: str, peak: int):
+    print("{:<40} {:>10.1f} MB peak".format(name, peak / 1024 / 1024))
+
+def report(name: str, count: int, elapsed: float):
+    print("{:<40} {:>10.3f} s {:>12.0f} strokes/s".format(name, elapsed, count / elapsed if elapsed > 0 else 0))
+
+def bench_backend(args):
+    media = create_synthetic_media(args.strokes)
+    for backend in [dlmt.NumericBackend.FRACTION, dlmt.NumericBackend.FLOAT]:
+        config = media.create_page_pixel_coordinate("i:1", args.width, backend)
+        elapsed = timeit(lambda: media.to_xml_svg_file(config, io.BytesIO()), args.repeat)
+        report("svg conversion ({})".format(dlmt.NumericBackend.to_string(backend)), args.strokes, elapsed)
+
+def bench_rotate(args):
+    vpaths = [dlmt.VPath.from_dalmatian_string(brush_path) for brush_path in brush_paths]
+    angles = [Fraction(i, 64) for i in range(1, 64)]
+    rotations = [(choice(vpaths), choice(angles)) for _ in range(args.strokes)]
+    elapsed = timeit(lambda: [legacy_rotate(vpath, angle) for vpath, angle in rotations], args.repeat)
+    report("VPath.rotate (per point trigonometry)", args.strokes, elapsed)
+    elapsed = timeit(lambda: [vpath.rotate(angle) for vpath, angle in rotations], args.repeat)
+    report("VPath.rotate (cached matrix)", args.strokes, elapsed)
+    floatpaths = [(vpath.to_backend(dlmt.NumericBackend.FLOAT), angle) for vpath, angle in rotations]
+    elapsed = timeit(lambda: [vpath.rotate(angle, dlmt.NumericBackend.FLOAT) for vpath, angle in floatpaths], args.repeat)
+    report("VPath.rotate (cached matrix, float)", args.strokes, elapsed)
+
+def bench_transform(args):
+    media = create_synthetic_media(args.strokes)
+    def uncached():
+        return [dlmt.PageBrushstroke(media.get_brush_by_id(bs.brushid).vpath.rotate(bs.angle).scale(media.headers.brush_page_ratio).scale(bs.scale).translate(bs.xy), set(bs.tags)) for bs in media.brushstrokes]
+    elapsed = timeit(uncached, args.repeat)
+    report("to_page_brushstroke_list (uncached)", args.strokes, elapsed)
+    elapsed = timeit(media.to_page_brushstroke_list, args.repeat)
+    report("to_page_brushstroke_list (cached)", args.strokes, elapsed)
+    print("transform cache: {} entries, {} hits, {} misses".format(len(media.transform_cache), media.transform_cache.hits, media.transform_cache.misses))
+
+def bench_symbols(args):
+    media = create_synthetic_media(args.strokes)
+    media.set_brushes([dlmt.DlmtBrush.from_string("brush i:1 ext-id brushes:polygon path {}".format(polygon_brush_path(48)))])
+    for mode in [dlmt.SvgRenderingMode.PATHS, dlmt.SvgRenderingMode.SYMBOLS]:
+        config = media.create_page_pixel_coordinate("i:1", args.width, dlmt.NumericBackend.FLOAT, mode)
+        output = io.BytesIO()
+        media.to_xml_svg_file(config, output)
+        elapsed = timeit(lambda: media.to_xml_svg_file(config, io.BytesIO()), args.repeat)
+        report("svg conversion ({})".format(dlmt.SvgRenderingMode.to_string(mode)), args.strokes, elapsed)
+        print("{:<40} {:>10} bytes".format("svg size ({})".format(dlmt.SvgRenderingMode.to_string(mode)), len(output.getvalue())))
+
+def bench_import(args):
+    def run_python(code: str):
+        subprocess.run([sys.executable, "-c", code], cwd = scriptdir, check = True)
+    baseline = timeit(lambda: run_python("pass"), args.repeat)
+    checks = [
+        ("import dlmt", "import dlmt"),
+        ("import dlmt + renderer", "import dlmt; dlmt.SvgRenderingConfig"),
+        ("import dlmt.cli", "import dlmt.cli")
+    ]
+    for name, code in checks:
+        elapsed = timeit(lambda: run_python(code), args.repeat)
+        print("{:<40} {:>10.3f} ms".format(name, (elapsed - baseline) * 1000))
+    code = "import sys, dlmt; print(' '.join(sorted(name for name in ['xml.etree.ElementTree', 'glob', 'random', 'argparse', 'subprocess', 'concurrent.futures'] if name in sys.modules)))"
+    loaded = subprocess.run([sys.executable, "-c", code], cwd = scriptdir, check = True, stdout = subprocess.PIPE).stdout.decode().strip()
+    print("optional modules loaded by 'import dlmt': {}".format(loaded or "none"))
+
+def bench_parse(args):
+    media = create_synthetic_media(args.strokes)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "synthetic.dlmt")
+        with open(filename, "w") as dlmtfile:
+            dlmtfile.write(media.to_string())
+        def read_whole_file():
+            with open(filename, "r") as dlmtfile:
+                return dlmt.DalmatianMedia.from_string(dlmtfile.read())
+        def count_streamed_brushstrokes():
+            with open(filename, "r") as dlmtfile:
+                reader = dlmt.parser.DlmtStreamReader(dlmtfile)
+                reader.read_media()
+                return sum(1 for _ in reader.iter_brushstrokes())
+        report("parse whole file", args.strokes, timeit(read_whole_file, args.repeat))
+        report("parse streamed file", args.strokes, timeit(lambda: dlmt.read_dlmt_file(filename), args.repeat))
+        report("stream brushstrokes only", args.strokes, timeit(count_streamed_brushstrokes, args.repeat))
+        report_memory("parse whole file", peak_memory(read_whole_file))
+        report_memory("parse streamed file", peak_memory(lambda: dlmt.read_dlmt_file(filename)))
+        report_memory("stream brushstrokes only", peak_memory(count_streamed_brushstrokes))
+
+def bench_stream(args):
+    media = create_synthetic_media(args.strokes)
+    config = media.create_page_pixel_coordinate("i:1", args.width, dlmt.NumericBackend.FLOAT)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "synthetic.svg")
+        element_tree = lambda: dlmt.media_to_xml_svg(media, config).write(filename, encoding = 'UTF-8')
+        streamed = lambda: dlmt.write_xml_svg_file(media, config, filename)
+        report("svg writing (ElementTree)", args.strokes, timeit(element_tree, args.repeat))
+        report("svg writing (streamed)", args.strokes, timeit(streamed, args.repeat))
+        report_memory("svg writing (ElementTree)", peak_memory(element_tree))
+        report_memory("svg writing (streamed)", peak_memory(streamed))
+
+def bench_cull(args):
+    media = create_synthetic_media(args.strokes)
+    view = dlmt.DlmtView.from_string("view i:2 lang en xy 2/5 2/5 width 1/10 height 1/10 flags O tags all but [ ] -> zoomed")
+    for backend in [dlmt.NumericBackend.FRACTION, dlmt.NumericBackend.FLOAT]:
+        name = dlmt.NumericBackend.to_string(backend)
+        scanned = list(media.iter_brushstrokes_for_view(view, backend, media.brushstrokes))
+        indexed = list(media.iter_brushstrokes_for_view(view, backend))
+        assert indexed == scanned, "Spatial index disagrees with the full scan"
+        report("view culling ({}, full scan)".format(name), args.strokes, timeit(lambda: list(media.iter_brushstrokes_for_view(view, backend, media.brushstrokes)), args.repeat))
+        report("view culling ({}, spatial index)".format(name), args.strokes, timeit(lambda: list(media.iter_brushstrokes_for_view(view, backend)), args.repeat))
+        print("{:<40} {:>10} of {} strokes".format("visible ({})".format(name), len(indexed), args.strokes))
+    media.spatial_index = None
+    report("spatial index build", args.strokes, timeit(lambda: media.set_brushstrokes(media.brushstrokes).get_spatial_index(), args.repeat))
+
+def bench_views(args):
+    media = create_synthetic_media(args.strokes)
+    media.set_views([dlmt.DlmtView.from_string("view i:{} lang en xy {} {} width 1/2 height 1/2 flags O tags all but [ ] -> quarter".format(i + 1, x, y)) for i, (x, y) in enumerate([("0", "0"), ("1/2", "0"), ("0", "1/2"), ("1/2", "1/2"), ("1/4", "1/4")])])
+    media.add_view_string("view i:6 lang en xy 0 0 width 1 height 1 flags o tags all but [ ] -> everything")
+    for backend in [dlmt.NumericBackend.FRACTION, dlmt.NumericBackend.FLOAT]:
+        configs = [media.create_page_pixel_coordinate_with_view(args.width, view, backend) for view in media.get_sorted_views()]
+        separate = lambda: [media.to_xml_svg_file(config, io.BytesIO()) for config in configs]
+        shared = lambda: media.to_xml_svg_files(configs, [io.BytesIO() for _ in configs])
+        name = dlmt.NumericBackend.to_string(backend)
+        report("{} views ({}, one by one)".format(len(configs), name), args.strokes, timeit(separate, args.repeat))
+        report("{} views ({}, shared geometry)".format(len(configs), name), args.strokes, timeit(shared, args.repeat))
+
+def bench_tags(args):
+    media = create_synthetic_media(args.strokes)
+    tagids = ["i:{}".format(i) for i in range(1, 65)]
+    media.set_tag_descriptions([dlmt.DlmtTagDescription.from_string("tag {} lang en same-as [] -> tag {}".format(tagid, tagid)) for tagid in tagids])
+    brushstrokes = list(media.brushstrokes)
+    for bs in brushstrokes:
+        bs.tags = [choice(tagids) for _ in range(randint(1, 3))]
+    media.set_brushstrokes(brushstrokes)
+    views = [
+        dlmt.DlmtView.from_string("view i:1 lang en xy 0 0 width 1 height 1 flags C tags all but [ i:1, i:2, i:3 ] -> all but"),
+        dlmt.DlmtView.from_string("view i:2 lang en xy 0 0 width 1 height 1 flags C tags none but [ i:4, i:5 ] -> none but")
+    ]
+    for view in views:
+        expected = [i for i, bs in enumerate(brushstrokes) if view.accept_tags(set(bs.tags))]
+        assert [i for i, _ in media.iter_brushstroke_indexes_for_view(view)] == expected, "Tag index disagrees with the set filter"
+        report("tags {} (sets)".format(view.description), args.strokes, timeit(lambda: [bs for bs in brushstrokes if view.accept_tags(set(bs.tags))], args.repeat))
+        report("tags {} (bitmasks)".format(view.description), args.strokes, timeit(lambda: list(media.iter_brushstroke_indexes_for_view(view)), args.repeat))
+    report("tag index build", args.strokes, timeit(lambda: media.set_brushstrokes(media.brushstrokes).get_tag_index(), args.repeat))
+
+def bench_store(args):
+    # meant to be run with -n 1000000
+    media = create_synthetic_media(args.strokes)
+    tagids = ["i:{}".format(i) for i in range(1, 9)]
+    media.set_brushstrokes([dlmt.DlmtBrushstroke(brushid = bs.brushid, xy = bs.xy, scale = bs.scale, angle = bs.angle, tags = [choice(tagids)]) for bs in media.brushstrokes])
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "synthetic.dlmt")
+        with open(filename, "w") as dlmtfile:
+            dlmtfile.write(media.to_string())
+        media = None
+        def read_objects():
+            with open(filename, "r") as dlmtfile:
+                return list(dlmt.parser.DlmtStreamReader(dlmtfile).iter_brushstrokes())
+        report("read brushstrokes (objects)", args.strokes, timeit(read_objects, 1))
+        report("read brushstrokes (columns)", args.strokes, timeit(lambda: dlmt.read_dlmt_file(filename), 1))
+        report_memory("read brushstrokes (objects)", peak_memory(read_objects))
+        report_memory("read brushstrokes (columns)", peak_memory(lambda: dlmt.read_dlmt_file(filename)))
+        media = dlmt.read_dlmt_file(filename)
+        config = media.create_page_pixel_coordinate("i:1", args.width, dlmt.NumericBackend.FLOAT)
+        report("svg writing (columns, float)", args.strokes, timeit(lambda: media.to_xml_svg_file(config, io.BytesIO()), 1))
+
+def bench_numpy(args):
+    media = create_synthetic_media(args.strokes)
+    media.set_brushes([dlmt.DlmtBrush.from_string("brush i:1 ext-id brushes:polygon path {}".format(polygon_brush_path(12)))])
+    if not dlmt.vectorized.is_available():
+        print("NumPy is not installed")
+        return
+    for backend in [dlmt.NumericBackend.FRACTION, dlmt.NumericBackend.FLOAT]:
+        name = dlmt.NumericBackend.to_string(backend)
+        outputs = []
+        for engine in [dlmt.SvgRenderingEngine.PYTHON, dlmt.SvgRenderingEngine.NUMPY]:
+            config = media.create_page_pixel_coordinate("i:1", args.width, backend, dlmt.SvgRenderingMode.PATHS, engine)
+            output = io.BytesIO()
+            media.to_xml_svg_file(config, output)
+            outputs.append(output.getvalue())
+            report("svg conversion ({}, {})".format(name, dlmt.SvgRenderingEngine.to_string(engine)), args.strokes, timeit(lambda: media.to_xml_svg_file(config, io.BytesIO()), args.repeat))
+        assert outputs[0] == outputs[1], "NumPy engine output differs from the python engine"
+
+def bench_binary(args):
+    media = create_synthetic_media(args.strokes)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "synthetic.dlmt")
+        with open(filename, "w") as dlmtfile:
+            dlmtfile.write(media.to_string())
+        sidecar = dlmt.binary.get_sidecar_filename(filename)
+        dlmt.read_dlmt_file_cached(filename)
+        assert dlmt.read_binary_file(sidecar) == dlmt.read_dlmt_file(filename), "Binary sidecar differs from the source"
+        print("{:<40} {:>10} bytes".format("dlmt size", os.path.getsize(filename)))
+        print("{:<40} {:>10} bytes".format("binary size", os.path.getsize(sidecar)))
+        report("read text", args.strokes, timeit(lambda: dlmt.read_dlmt_file(filename), args.repeat))
+        report("read binary (mmap)", args.strokes, timeit(lambda: dlmt.read_binary_file(sidecar), args.repeat))
+        report("read cached (digest + mmap)", args.strokes, timeit(lambda: dlmt.read_dlmt_file_cached(filename), args.repeat))
+        report("write binary", args.strokes, timeit(lambda: dlmt.write_binary_file(media, sidecar), args.repeat))
+
+def bench_tokenizer(args):
+    media = create_synthetic_media(args.strokes)
+    lines = [brushstroke.to_string() for brushstroke in media.brushstrokes]
+    def legacy_store():
+        store = dlmt.BrushstrokeStore()
+        for line in lines:
+            store.append_fields(*dlmt.DlmtBrushstroke.split_string(line))
+        return store
+    def tokenized_store():
+        store = dlmt.BrushstrokeStore()
+        for line in lines:
+            store.append_string(line)
+        return store
+    assert legacy_store() == tokenized_store(), "Tokenized brushstrokes differ from the split parser"
+    report("brushstroke lines (split)", args.strokes, timeit(lambda: [dlmt.DlmtBrushstroke.split_string(line) for line in lines], args.repeat))
+    report("brushstroke lines (tokenized)", args.strokes, timeit(lambda: [dlmt.DlmtBrushstroke.parse_string(line) for line in lines], args.repeat))
+    report("brushstroke store (split)", args.strokes, timeit(legacy_store, args.repeat))
+    report("brushstroke store (tokenized)", args.strokes, timeit(tokenized_store, args.repeat))
+    segments = [segment for path in brush_paths for segment in path.replace("[", "").replace("]", "").strip().split(",")] * (args.strokes // 10 + 1)
+    def legacy_segment(dstr):
+        if dstr == "Z":
+            return None
+        return dlmt.SegmentShape.from_string(dstr.strip()[0]), dlmt.V2dList.from_dalmatian_string(dstr.strip()[1:])
+    report("brush path segments (split)", len(segments), timeit(lambda: [legacy_segment(segment) for segment in segments], args.repeat))
+    report("brush path segments (tokenized)", len(segments), timeit(lambda: [dlmt.VSegment.from_dalmatian_string(segment) for segment in segments], args.repeat))
+
+def report_stage(name: str, count: int, fn, repeat: int):
+    elapsed = timeit(fn, repeat)
+    peak = peak_memory(fn)
+    print("{:<40} {:>10.3f} s {:>12.0f} strokes/s {:>10.1f} MB peak".format(name, elapsed, count / elapsed if elapsed > 0 else 0, peak / 1024 / 1024))
+
+def bench_e2e(args):
+    # every stage of a conversion, on synthetic media of each size
+    for count in [int(size) for size in args.sizes.split(",")]:
+        print("-- {} strokes, {} brushes, {} tags, {} views".format(count, args.brushes, args.tags, args.views))
+        report_stage("generate", count, lambda: dlmt.synthetic.create_synthetic_media(count, args.brushes, args.tags, args.views), 1)
+        media = dlmt.synthetic.create_synthetic_media(count, args.brushes, args.tags, args.views)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "synthetic.dlmt")
+            def write_text():
+                with open(filename, "w") as dlmtfile:
+                    dlmt.synthetic.write_synthetic_media(media, dlmtfile)
+            report_stage("write text", count, write_text, args.repeat)
+            print("{:<40} {:>10.1f} MB".format("dlmt size", os.path.getsize(filename) / 1024 / 1024))
+            report_stage("parse", count, lambda: dlmt.read_dlmt_file(filename), args.repeat)
+            views = media.get_sorted_views()
+            backend = dlmt.NumericBackend.FLOAT
+            report_stage("page brushstrokes (whole page)", count, lambda: media.page_brushstroke_list_for_view(views[0], backend), args.repeat)
+            report_stage("view culling (other views)", count, lambda: [list(media.iter_visible_brushstroke_indexes(view, backend)) for view in views[1:]], args.repeat)
+            config = media.create_page_pixel_coordinate(views[0].id, args.width, backend)
+            report_stage("svg (whole page)", count, lambda: media.to_xml_svg_file(config, os.path.join(tmpdir, "page.svg")), args.repeat)
+            configs = [media.create_page_pixel_coordinate_with_view(args.width, view, backend) for view in views]
+            report_stage("svg (all views)", count, lambda: media.to_xml_svg_files(configs, [os.path.join(tmpdir, "view{}.svg".format(i)) for i in range(len(configs))]), args.repeat)
+
+def instance_size(create, count: int = 10000)->float:
+    # traced bytes per instance, with the attributes a plain object keeps outside of it
+    tracemalloc.start()
+    try:
+        instances = [create() for _ in range(count)]
+        return tracemalloc.get_traced_memory()[0] / len(instances)
+    finally:
+        tracemalloc.stop()
+
+def retained_blocks(fn)->int:
+    # memory blocks still allocated while the result of fn is alive
+    before = sys.getallocatedblocks()
+    result = fn()
+    blocks = sys.getallocatedblocks() - before
+    del result
+    return blocks
+
+def bench_objects(args):
+    # meant to be run with -n 1000000
+    x, y = Fraction(1, 3), Fraction(2, 3)
+    point = dlmt.V2d(x, y)
+    segment = dlmt.VSegment.from_cubic_bezier(point, point, point)
+    vpath = dlmt.VPath([segment])
+    tags = set()
+    for name, create in [("V2d", lambda: dlmt.V2d(x, y)), ("VSegment", lambda: dlmt.VSegment.from_cubic_bezier(point, point, point)), ("PageBrushstroke", lambda: dlmt.PageBrushstroke(vpath, tags))]:
+        print("{:<40} {:>10.1f} bytes".format(name, instance_size(create)))
+    media = dlmt.synthetic.create_synthetic_media(args.strokes, args.brushes, args.tags, args.views)
+    segments = [segment for brush in media.brushes_dict.values() for segment in brush.vpath.segments]
+    print("{:<40} {:>10} of {}".format("distinct brush segments", len(set(id(segment) for segment in segments)), len(segments)))
+    view = media.get_sorted_views()[0]
+    for backend in [dlmt.NumericBackend.FRACTION, dlmt.NumericBackend.FLOAT]:
+        name = "page brushstrokes ({})".format(dlmt.NumericBackend.to_string(backend))
+        def page_brushstrokes():
+            media.transform_cache.clear()
+            return media.page_brushstroke_list_for_view(view, backend)
+        report(name, args.strokes, timeit(page_brushstrokes, args.repeat))
+        report_memory(name, peak_memory(page_brushstrokes))
+        print("{:<40} {:>10} blocks".format(name, retained_blocks(page_brushstrokes)))
+
+def bench_lod(args):
+    # thumbnails of a synthetic media, drawn in full and with the level of detail
+    media = dlmt.synthetic.create_synthetic_media(args.strokes, args.brushes, args.tags, args.views)
+    view = media.get_sorted_views()[0]
+    for width in [int(size) for size in args.lod_widths.split(",")]:
+        for level_of_detail in [False, True]:
+            config = media.create_page_pixel_coordinate_with_view(width, view, dlmt.NumericBackend.FLOAT, level_of_detail = level_of_detail)
+            output = io.BytesIO()
+            media.to_xml_svg_file(config, output)
+            svg = output.getvalue()
+            name = "svg {} px ({})".format(width, "lod" if level_of_detail else "full")
+            report(name, args.strokes, timeit(lambda: media.to_xml_svg_file(config, io.BytesIO()), args.repeat))
+            print("{:<40} {:>10} paths {:>10.1f} KB {:>10} segments".format(name, svg.count(b"<path"), len(svg) / 1024, len(re.findall(rb"[MLCSQTZ]", svg))))
+
+def bench_raster(args):
+    # png of each view of a synthetic media, with the python rasteriser and with inkscape when it is installed
+    media = dlmt.synthetic.create_synthetic_media(args.strokes, args.brushes, args.tags, args.views)
+    configs = [media.create_page_pixel_coordinate_with_view(args.width, view, dlmt.NumericBackend.FLOAT) for view in media.get_sorted_views()]
+    count = args.strokes * len(configs)
+    print("{:<40} {:>10} views of {} px".format("png", len(configs), args.width))
+    for supersampling in [1, dlmt.raster.RASTER_SUPERSAMPLING]:
+        report("python rasteriser ({}x)".format(supersampling), count, timeit(lambda: [dlmt.raster.render_png(media, config, "white", supersampling) for config in configs], args.repeat))
+    if shutil.which("inkscape") is None:
+        print("Inkscape is not installed")
+        return
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filenames = [os.path.join(tmpdir, "view{}.svg".format(i)) for i in range(len(configs))]
+        def inkscape():
+            media.to_xml_svg_files(configs, filenames)
+            for result in dlmt.cli.write_png_batch(filenames, "white", 600):
+                assert result.is_success(), result.error
+        report("svg + inkscape (one batch)", count, timeit(inkscape, args.repeat))
+
+def bench_server(args):
+    # the same media rendered at several widths: a process per rendering, then requests to a running server
+    widths = [int(size) for size in args.lod_widths.split(",")]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        media = dlmt.synthetic.create_synthetic_media(args.strokes, args.brushes, args.tags, args.views)
+        with open(os.path.join(tmpdir, "synthetic.dlmt"), "w") as dlmtfile:
+            dlmt.synthetic.write_synthetic_media(media, dlmtfile)
+        outdir = os.path.join(tmpdir, "out")
+        os.makedirs(outdir)
+        def run_processes():
+            for width in widths:
+                subprocess.run([sys.executable, os.path.join(scriptdir, "convert-dlmt-to-svg.py"), "-i", tmpdir, "-o", outdir, "-W", str(width), "-n", "float"], stdout = subprocess.DEVNULL, check = True)
+        report("process per rendering", args.strokes * len(widths), timeit(run_processes, args.repeat))
+        server = dlmt.server.RenderServer(("127.0.0.1", 0), dlmt.server.RenderService(tmpdir))
+        thread = threading.Thread(target = server.serve_forever, daemon = True)
+        thread.start()
+        try:
+            def request_renderings():
+                for width in widths:
+                    with urllib.request.urlopen("http://127.0.0.1:{}/render?file=synthetic.dlmt&width={}&numeric=float".format(server.server_address[1], width)) as response:
+                        response.read()
+            report("server (first requests)", args.strokes * len(widths), timeit(request_renderings, 1))
+            report("server (cached media)", args.strokes * len(widths), timeit(request_renderings, args.repeat))
+            stats = server.service.to_stats_obj()
+            print("{:<40} {:>10} hits, {} misses".format("media cache", stats["media cache"]["hits"], stats["media cache"]["misses"]))
+            print("{:<40} {:>10} hits, {} misses".format("transform cache", stats["transform cache"]["hits"], stats["transform cache"]["misses"]))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+def bench_rendercache(args):
+    # the svg of each view of a synthetic media, rendered every time, then looked up in memory and on disk
+    media = dlmt.synthetic.create_synthetic_media(args.strokes, args.brushes, args.tags, args.views)
+    configs = [media.create_page_pixel_coordinate_with_view(args.width, view, dlmt.NumericBackend.FLOAT) for view in media.get_sorted_views()]
+    count = args.strokes * len(configs)
+    def render_views():
+        for config in configs:
+            media.to_xml_svg_file(config, io.BytesIO())
+    report("media digest", args.strokes, timeit(lambda: dlmt.rendercache.get_media_digest(media), args.repeat))
+    report("no render cache", count, timeit(render_views, args.repeat))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, create_cache in [("memory", lambda: dlmt.rendercache.MemoryRenderCache()), ("disk", lambda: dlmt.rendercache.DiskRenderCache(tmpdir))]:
+            cache = create_cache()
+            # without a pinned digest, each rendering hashes the media
+            media.set_render_cache(cache)
+            report("{} render cache (misses)".format(name), count, timeit(render_views, 1))
+            report("{} render cache (hits)".format(name), count, timeit(render_views, args.repeat))
+            print("{:<40} {:>10} hits, {} misses".format(name + " render cache", cache.hits, cache.misses))
+    media.set_render_cache(None)
+
+def bench_generate(args):
+    media = dlmt.synthetic.create_synthetic_media(args.strokes, args.brushes, args.tags, args.views)
+    with open(args.output, "w") as dlmtfile:
+        dlmt.synthetic.write_synthetic_media(media, dlmtfile)
+    print("{:<40} {:>10} strokes".format(args.output, args.strokes))
+
+def bench_pipeline(args):
+    # a network filesystem is simulated by a delay on each read and write
+    def slow_read(filename):
+        sleep(args.latency)
+        return read_source(filename)
+    def slow_write(result):
+        sleep(args.latency)
+        return write_contents(result)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filenames = []
+        for i in range(args.files):
+            media = dlmt.synthetic.create_synthetic_media(args.strokes, random_seed = i)
+            media.headers.set_text("name", "en", "synthetic{}".format(i))
+            filename = os.path.join(tmpdir, "synthetic{}.dlmt".format(i))
+            with open(filename, "w") as dlmtfile:
+                dlmt.synthetic.write_synthetic_media(media, dlmtfile)
+            filenames.append(filename)
+        cliargs = argparse.Namespace(outdirectory = tmpdir, prefix = "", width = args.width, view = "i:1", numeric = "float", mode = "paths", engine = "python", lod = False, rasteriser = "inkscape", png_supersampling = 4, cache = False, render_cache = None, metrics = None, profile = None, format = "svg", background = "white", png_timeout = 120)
+        def sequential():
+            for filename in filenames:
+                slow_write(dlmt.cli.convert_file(filename, cliargs, slow_read(filename), True))
+        dlmt.pipeline.read_source = slow_read
+        dlmt.pipeline.write_contents = slow_write
+        count = args.files * args.strokes
+        print("{:<40} {:>10} files, {} s latency".format("sources", args.files, args.latency))
+        report("sequential", count, timeit(sequential, args.repeat))
+        report("pipeline (1 process)", count, timeit(lambda: dlmt.pipeline.run_pipeline(filenames, cliargs, 1, 1), args.repeat))
+        if os.cpu_count() > 1:
+            report("pipeline ({} processes)".format(os.cpu_count()), count, timeit(lambda: dlmt.pipeline.run_pipeline(filenames, cliargs, os.cpu_count(), 1), args.repeat))
+
+suites = {
+    "backend": bench_backend,
+    "rotate": bench_rotate,
+    "transform": bench_transform,
+    "symbols": bench_symbols,
+    "import": bench_import,
+    "parse": bench_parse,
+    "stream": bench_stream,
+    "cull": bench_cull,
+    "views": bench_views,
+    "tags": bench_tags,
+    "store": bench_store,
+    "numpy": bench_numpy,
+    "binary": bench_binary,
+    "tokenizer": bench_tokenizer,
+    "objects": bench_objects,
+    "lod": bench_lod,
+    "raster": bench_raster,
+    "server": bench_server,
+    "rendercache": bench_rendercache,
+    "e2e": bench_e2e,
+    "generate": bench_generate,
+    "pipeline": bench_pipeline
+}
+
+parser = argparse.ArgumentParser(description = 'Benchmark the Dalmatian Mask Tape converter')
+parser.add_argument("-s", "--suite", help="Benchmark suite to run ({})".format(", ".join(suites.keys())), default = "backend")
+parser.add_argument("-n", "--strokes", help="Number of brushstrokes in the synthetic media", type = int, default = 10000)
+parser.add_argument("-W", "--width", help="The width of generated bitmap in pixels.", type = int, default = 1000)
+parser.add_argument("-r", "--repeat", help="Number of repetitions, the best time is reported", type = int, default = 3)
+parser.add_argument("--sizes", help="Comma separated numbers of brushstrokes for the e2e suite", default = "1000,100000,1000000")
+parser.add_argument("--brushes", help="Number of brushes in the generated media (e2e, generate, objects, lod, raster)", type = int, default = 8)
+parser.add_argument("--tags", help="Number of tags in the generated media (e2e, generate, objects, lod, raster)", type = int, default = 16)
+parser.add_argument("--views", help="Number of views in the generated media (e2e, generate, objects, lod, raster)", type = int, default = 4)
+parser.add_argument("--lod-widths", help="Comma separated widths in pixels of the thumbnails (lod, server)", default = "100,400,1600")
+parser.add_argument("--files", help="Number of generated sources (pipeline)", type = int, default = 8)
+parser.add_argument("--latency", help="Simulated seconds of latency of each read and write (pipeline)", type = float, default = 0.2)
+parser.add_argument("-o", "--output", help="The dlmt file written by the generate suite", default = "synthetic.dlmt")
+args = parser.parse_args()
+
+if args.suite not in suites:
+    parser.error("Unknown suite: {}".format(args.suite))
+suites[args.suite](args)
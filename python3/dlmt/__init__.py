@@ -0,0 +1,30 @@
+import sys
+
+# the oldest python the scripts run on, for the module __getattr__ below
+MINIMUM_PYTHON_VERSION = (3, 7)
+
+def check_python_version():
+    if sys.version_info[:2] < MINIMUM_PYTHON_VERSION:
+        print("This script requires Python {}.{} or higher!".format(*MINIMUM_PYTHON_VERSION))
+        print("You are using Python {}.{}.".format(sys.version_info.major, sys.version_info.minor))
+        sys.exit(1)
+
+from .cache import LruCache
+from .geometry import FLOAT_EDGE_MARGIN, TRIGONOMETRY_CACHE_SIZE, FractionList, NumericBackend, SegmentShape, V2d, V2dList, V2dRect, VPath, VSegment, atanFract, cosFract, rotation_matrix, sinFract
+from .model import TRANSFORM_CACHE_SIZE, AxisDir, BrushstrokeStore, CoordinateType, DalmatianMedia, DlmtBrush, DlmtBrushCoordinateSystem, DlmtBrushstroke, DlmtCoordinateSystem, DlmtHeaders, DlmtTagDescription, DlmtView, PageBrushstroke
+from .parser import read_dlmt_file
+from .text import as_exact_float_string, as_float_string, as_tidy_name, get_prefix, parse_dlmt_array, parse_dlmt_dict, strip_empty, strip_string_array, strip_unknown, to_dlmt_array, to_dlmt_dict
+from .tokenizer import DlmtSyntaxError
+
+# the renderer pulls in xml.etree, so it is only imported when one of its names is first used
+_lazy_renderer_names = ["SvgRenderingConfig", "SvgRenderingEngine", "SvgRenderingMode", "media_to_xml_svg", "write_xml_svg_file", "write_xml_svg_files"]
+_lazy_binary_names = ["read_binary_file", "read_dlmt_file_cached", "write_binary_file"]
+
+def __getattr__(name: str):
+    if name in _lazy_renderer_names:
+        from . import renderer
+        return getattr(renderer, name)
+    if name in _lazy_binary_names:
+        from . import binary
+        return getattr(binary, name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from fractions import Fraction
+from typing import Dict, Tuple
+
+from .columns import FractionColumn, InternedColumn
+from .metrics import ConversionMetrics, timer
+from .model import BrushstrokeStore, DalmatianMedia
+from .parser import read_dlmt_file, read_dlmt_stream
+
+# magic, version, reserved, sha256 of the .dlmt source (zeros when unknown)
+BINARY_MAGIC = b"DLMTBIN\x00"
+BINARY_VERSION = 2
+BINARY_HEADER = struct.Struct("<8sII32s")
+# name, array typecode of the integers (zero for other payloads) and length of each block,
+# whose payload is padded to 8 bytes so that integer arrays can be mapped in place
+BLOCK_HEADER = struct.Struct("<4sc3xQ")
+# the narrowest that holds every value of a column is used, rows and denominators mostly fit in a byte or two
+INTEGER_TYPECODES = [("B", 0, 0xff), ("b", -0x80, 0x7f), ("H", 0, 0xffff), ("h", -0x8000, 0x7fff), ("I", 0, 0xffffffff), ("i", -0x80000000, 0x7fffffff), ("q", -0x8000000000000000, 0x7fffffffffffffff)]
+SIDECAR_EXTENSION = ".bin"
+FRACTION_COLUMNS = [("xs", b"X", False), ("ys", b"Y", False), ("scales", b"S", True), ("angles", b"A", True)]
+
+def get_integer_typecode(values)->str:
+    low, high = (min(values), max(values)) if len(values) > 0 else (0, 0)
+    for typecode, minimum, maximum in INTEGER_TYPECODES:
+        if minimum <= low and high <= maximum:
+            return typecode
+    raise ValueError("Integers out of 64 bits: {} to {}".format(low, high))
+
+def to_integer_block(name: bytes, values)->bytes:
+    typecode = get_integer_typecode(values)
+    data = array(typecode, values)
+    if sys.byteorder != "little":
+        data.byteswap()
+    return to_block(name, data.tobytes(), typecode)
+
+def to_integer_sequence(block: Tuple[str, memoryview]):
+    typecode, payload = block
+    if sys.byteorder == "little":
+        return payload.cast(typecode)
+    data = array(typecode)
+    data.frombytes(payload)
+    data.byteswap()
+    return data
+
+def to_block(name: bytes, payload: bytes, typecode: str = None)->bytes:
+    padding = b"\x00" * (-len(payload) % 8)
+    return BLOCK_HEADER.pack(name, typecode.encode("ascii") if typecode is not None else b"\x00", len(payload)) + payload + padding
+
+def to_json_bytes(value)->bytes:
+    return json.dumps(value, separators = (",", ":")).encode("utf-8")
+
+def media_to_binary(media: DalmatianMedia, source_digest: bytes = b"")->bytes:
+    store = media.brushstrokes
+    blocks = [
+        to_block(b"TEXT", "\n".join(media.to_string_list(with_brushstrokes = False)).encode("utf-8")),
+        to_block(b"STRS", to_json_bytes({ "brushids": store.brushids.values, "tags": [list(tags) for tags in store.tags.values] })),
+        to_integer_block(b"BROW", store.brushids.rows),
+        to_integer_block(b"TROW", store.tags.rows)
+    ]
+    for attribute, prefix, _ in FRACTION_COLUMNS:
+        column = getattr(store, attribute)
+        if column.values is None:
+            blocks.append(to_integer_block(prefix + b"NUM", column.numerators))
+            blocks.append(to_integer_block(prefix + b"DEN", column.denominators))
+        else:
+            # fractions that do not fit in 64 bits are kept as text
+            blocks.append(to_block(prefix + b"FRC", to_json_bytes([str(value) for value in column.values])))
+    return BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, source_digest) + b"".join(blocks)
+
+def read_binary_header(buffer)->bytes:
+    magic, version, _, source_digest = BINARY_HEADER.unpack_from(buffer, 0)
+    assert magic == BINARY_MAGIC, "Not a binary dlmt media"
+    assert version == BINARY_VERSION, "Unsupported binary dlmt version: {}".format(version)
+    return source_digest
+
+def read_blocks(buffer)->Dict[bytes, Tuple[str, memoryview]]:
+    # the typecode and payload of each block
+    view = memoryview(buffer)
+    blocks = {}
+    offset = BINARY_HEADER.size
+    while offset < len(view):
+        name, typecode, length = BLOCK_HEADER.unpack_from(view, offset)
+        offset += BLOCK_HEADER.size
+        assert offset + length <= len(view), "Truncated block {}".format(name)
+        blocks[name] = (typecode.decode("ascii"), view[offset:offset+length])
+        offset += length + (-length % 8)
+    return blocks
+
+def media_from_binary(buffer)->DalmatianMedia:
+    # with a mmap as buffer, the integer columns stay in the mapped file until they are appended to
+    read_binary_header(buffer)
+    blocks = read_blocks(buffer)
+    media = read_dlmt_stream(str(blocks[b"TEXT"][1], "utf-8").splitlines())
+    strings = json.loads(str(blocks[b"STRS"][1], "utf-8"))
+    columns = {}
+    for attribute, prefix, memoized in FRACTION_COLUMNS:
+        if prefix + b"FRC" in blocks:
+            columns[attribute] = FractionColumn.from_values([Fraction(value) for value in json.loads(str(blocks[prefix + b"FRC"][1], "utf-8"))], memoized)
+        else:
+            columns[attribute] = FractionColumn.from_buffers(to_integer_sequence(blocks[prefix + b"NUM"]), to_integer_sequence(blocks[prefix + b"DEN"]), memoized)
+    brushids = InternedColumn.from_buffer(strings["brushids"], to_integer_sequence(blocks[b"BROW"]))
+    tags = InternedColumn.from_buffer([tuple(value) for value in strings["tags"]], to_integer_sequence(blocks[b"TROW"]))
+    return media.set_brushstrokes(BrushstrokeStore.from_columns(brushids, columns["xs"], columns["ys"], columns["scales"], columns["angles"], tags))
+
+def write_binary_file(media: DalmatianMedia, filename: str, source_digest: bytes = b""):
+    # written next to the target then renamed, so that a reader never maps a half written file
+    tmpfilename = "{}.{}.tmp".format(filename, os.getpid())
+    with open(tmpfilename, "wb") as binfile:
+        binfile.write(media_to_binary(media, source_digest))
+    os.replace(tmpfilename, filename)
+
+def read_binary_file(filename: str)->DalmatianMedia:
+    with open(filename, "rb") as binfile:
+        mapped = mmap.mmap(binfile.fileno(), 0, access = mmap.ACCESS_READ)
+    return media_from_binary(mapped)
+
+def read_binary_source_digest(filename: str)->bytes:
+    with open(filename, "rb") as binfile:
+        return read_binary_header(binfile.read(BINARY_HEADER.size))
+
+def get_source_digest(filename: str)->bytes:
+    digest = hashlib.sha256()
+    with open(filename, "rb") as dlmtfile:
+        for chunk in iter(lambda: dlmtfile.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+def get_sidecar_filename(filename: str)->str:
+    return filename + SIDECAR_EXTENSION
+
+def read_dlmt_file_cached(filename: str, metrics: ConversionMetrics = None)->DalmatianMedia:
+    with timer(metrics, "read"):
+        source_digest = get_source_digest(filename)
+        sidecar = get_sidecar_filename(filename)
+        if os.path.exists(sidecar):
+            try:
+                if read_binary_source_digest(sidecar) == source_digest:
+                    media = read_binary_file(sidecar)
+                    if metrics is not None:
+                        metrics.add_count("binary cache hits")
+                    return media.set_metrics(metrics)
+            except (OSError, ValueError, struct.error, AssertionError):
+                # a stale, truncated or foreign sidecar is simply rebuilt from the source
+                pass
+    if metrics is not None:
+        metrics.add_count("binary cache misses")
+    media = read_dlmt_file(filename, metrics)
+    try:
+        with timer(metrics, "write"):
+            write_binary_file(media, sidecar, source_digest)
+    except OSError:
+        pass
+    return media
@@ -0,0 +1,37 @@
+from collections import OrderedDict
+
+class LruCache:
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, defaultValue = None):
+        if key not in self.entries:
+            self.misses += 1
+            return defaultValue
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last = False)
+        return self
+
+    def remove(self, key):
+        self.entries.pop(key, None)
+        return self
+
+    def clear(self):
+        self.entries.clear()
+        return self
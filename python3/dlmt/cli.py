@@ -0,0 +1,355 @@
+import argparse
+import cProfile
+import io
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from glob import glob
+from itertools import repeat
+from time import time
+from typing import Dict, List, Tuple
+
+from .binary import get_source_digest, read_dlmt_file_cached
+from .geometry import NumericBackend
+from .manifest import MANIFEST_FILENAME, ConversionManifest
+from .metrics import METRICS_VERSION, ConversionMetrics, time_iter, timer, write_metrics_file
+from .model import DalmatianMedia, default_view, get_cropped_view
+from .parser import DlmtStreamReader, read_dlmt_file, read_dlmt_stream
+from .renderer import SvgRenderingConfig, SvgRenderingEngine, SvgRenderingMode, is_vectorized_available
+from .text import as_tidy_name
+
+def get_png_filename(filename: str)->str:
+    return os.path.splitext(filename)[0] + ".png"
+
+class ConversionResult:
+    def __init__(self, filename: str, duration: float, error: str = None, outputs: List[str] = [], metrics: ConversionMetrics = None):
+        self.filename = filename
+        self.duration = duration
+        self.error = error
+        self.outputs = outputs
+        self.metrics = metrics
+        # the svg of each output, when they are rendered in memory and written later
+        self.contents: List[bytes] = None
+        # the png of each output, when the python rasteriser renders them in memory
+        self.png_contents: List[bytes] = None
+
+    def is_success(self)->bool:
+        return self.error is None
+
+def write_png_batch(filenames: List[str], color: str, timeout: float)->List[ConversionResult]:
+    # Inkscape 1.x exports every input file of a single invocation, which amortises its slow startup
+    started = time()
+    command = ["inkscape", "--export-type=png", "--export-background={}".format(color)] + filenames
+    error = None
+    try:
+        completed = subprocess.run(command, stdout = subprocess.PIPE, stderr = subprocess.PIPE, timeout = timeout)
+        if completed.returncode != 0:
+            error = "inkscape exited with status {}: {}".format(completed.returncode, completed.stderr.decode("utf-8", "replace").strip())
+    except subprocess.TimeoutExpired:
+        error = "inkscape timed out after {} seconds".format(timeout)
+    except OSError as oserror:
+        error = "inkscape could not be started: {}".format(oserror)
+    duration = (time() - started) / len(filenames)
+    results = []
+    for filename in filenames:
+        pngfilename = get_png_filename(filename)
+        if os.path.exists(pngfilename) and os.path.getmtime(pngfilename) >= started - 1:
+            results.append(ConversionResult(filename, duration, None, [pngfilename]))
+        else:
+            results.append(ConversionResult(filename, duration, error or "no png was exported", []))
+    return results
+
+def write_png(filename: str, color: str, timeout: float = 120)->ConversionResult:
+    return write_png_batch([filename], color, timeout)[0]
+
+def write_png_files(filenames: List[str], color: str, jobs: int = 1, timeout: float = 120, batch_size: int = 1, progress = None)->List[ConversionResult]:
+    batches = [filenames[i:i+batch_size] for i in range(0, len(filenames), batch_size)]
+    results = []
+    # threads are enough as each worker only waits for its own inkscape process
+    with ThreadPoolExecutor(max_workers = max(jobs, 1)) as executor:
+        for batch_results in executor.map(write_png_batch, batches, repeat(color), repeat(timeout)):
+            for result in batch_results:
+                results.append(result)
+                if progress is not None:
+                    progress(result)
+    return results
+
+def get_media_outputs(media: DalmatianMedia, args)->Tuple[List[str], List[SvgRenderingConfig]]:
+    basename = "{}/{}{}".format(args.outdirectory,args.prefix, media.headers.get_text("name", "en"))
+    filename = basename + ".svg"
+    numeric_backend = NumericBackend.from_string(args.numeric)
+    rendering_mode = SvgRenderingMode.from_string(args.mode)
+    rendering_engine = SvgRenderingEngine.from_string(args.engine)
+    if args.view == "default":
+        return [filename], [media.create_page_pixel_coordinate_with_view(int(args.width), default_view, numeric_backend, rendering_mode, rendering_engine, args.lod)]
+    elif args.view == "cropped":
+        return [filename], [media.create_page_pixel_coordinate_with_view(int(args.width), get_cropped_view(media), numeric_backend, rendering_mode, rendering_engine, args.lod)]
+    elif args.view == "all":
+        views = media.get_sorted_views()
+        filenames = ["{}-{}.svg".format(basename, as_tidy_name(view.id)) for view in views]
+        return filenames, [media.create_page_pixel_coordinate_with_view(int(args.width), view, numeric_backend, rendering_mode, rendering_engine, args.lod) for view in views]
+    else:
+        return [filename], [media.create_page_pixel_coordinate(args.view, int(args.width), numeric_backend, rendering_mode, rendering_engine, args.lod)]
+
+def write_media(media: DalmatianMedia, args, files: List = None)->List[str]:
+    # files are the file objects the svg are written to, instead of the output filenames
+    filenames, configs = get_media_outputs(media, args)
+    if files is None:
+        files = filenames
+    if len(configs) == 1:
+        media.to_xml_svg_file(configs[0], files[0])
+    else:
+        media.to_xml_svg_files(configs, files)
+    return filenames
+
+def is_streamable(args)->bool:
+    # a single view known from the header, drawn path by path from the brushstrokes as they are parsed,
+    # so that rendering starts before the end of the file and the brushstrokes are never all held
+    return args.view not in ["all", "cropped"] and SvgRenderingMode.from_string(args.mode) == SvgRenderingMode.PATHS and not args.lod and not args.cache and args.render_cache is None and not ("png" in args.format and args.rasteriser == "python")
+
+def write_streamed_media(filename: str, args, metrics: ConversionMetrics = None)->Tuple[DalmatianMedia, List[str], int]:
+    # the media without its brushstrokes, the svg written and the number of brushstrokes read
+    counts = [0]
+    def count_brushstrokes(brushstrokes):
+        for brushstroke in brushstrokes:
+            counts[0] += 1
+            yield brushstroke
+    with open(filename, "r") as dlmtfile:
+        reader = DlmtStreamReader(time_iter(metrics, "read", dlmtfile))
+        with timer(metrics, "header parse"):
+            media = reader.read_media().set_metrics(metrics)
+        filenames, configs = get_media_outputs(media, args)
+        # written next to the target then renamed, so that a syntax error late in the file leaves no partial svg
+        tmpfilename = "{}.{}.tmp".format(filenames[0], os.getpid())
+        try:
+            media.to_xml_svg_file(configs[0], tmpfilename, count_brushstrokes(time_iter(metrics, "parse", reader.iter_brushstrokes())))
+            os.replace(tmpfilename, filenames[0])
+        finally:
+            if os.path.exists(tmpfilename):
+                os.remove(tmpfilename)
+    if metrics is not None:
+        metrics.add_view_count(configs[0].view.id, "strokes in", counts[0])
+    return media, filenames, counts[0]
+
+def render_media_pngs(media: DalmatianMedia, args)->List[bytes]:
+    from .raster import render_png
+    _, configs = get_media_outputs(media, args)
+    return [render_png(media, config, args.background, args.png_supersampling) for config in configs]
+
+def write_media_pngs(media: DalmatianMedia, args)->List[str]:
+    # rendered from the media, next to the svg they correspond to
+    from .raster import write_png_file
+    filenames, configs = get_media_outputs(media, args)
+    pngfilenames = [get_png_filename(filename) for filename in filenames]
+    for pngfilename, config in zip(pngfilenames, configs):
+        write_png_file(media, config, pngfilename, args.background, args.png_supersampling)
+    return pngfilenames
+
+def get_render_parameters(args)->Dict[str, str]:
+    return { name: str(getattr(args, name)) for name in ["width", "view", "format", "background", "prefix", "numeric", "mode", "engine", "lod", "rasteriser", "png_supersampling"] }
+
+def record_conversions(manifest: ConversionManifest, digests: Dict[str, str], parameters: Dict[str, str], results: List[ConversionResult], png_results: List[ConversionResult], with_png: bool):
+    failed_svgs = set([result.filename for result in png_results if not result.is_success()])
+    for result in results:
+        if not result.is_success() or len(failed_svgs.intersection(result.outputs)) > 0:
+            continue
+        pngs = [get_png_filename(svg) for svg in result.outputs] if with_png else []
+        manifest.record(result.filename, digests[result.filename], parameters, result.outputs + pngs)
+    manifest.save()
+
+def get_profile_filename(directory: str, filename: str)->str:
+    return os.path.join(directory, os.path.basename(filename) + ".prof")
+
+def render_media_contents(media: DalmatianMedia, args)->Tuple[List[str], List[bytes]]:
+    filenames, configs = get_media_outputs(media, args)
+    files = [io.BytesIO() for _ in filenames]
+    write_media(media, args, files)
+    return filenames, [svgfile.getvalue() for svgfile in files]
+
+def convert_file(filename: str, args, text: str = None, in_memory: bool = False)->ConversionResult:
+    # text is the content of the source when it was already read, in_memory keeps the svg in the result instead of writing them
+    started = time()
+    metrics = ConversionMetrics() if args.metrics is not None else None
+    profiler = cProfile.Profile() if args.profile is not None else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        contents, png_contents = None, None
+        if text is None and not in_memory and is_streamable(args):
+            media, svgfilenames, stroke_count = write_streamed_media(filename, args, metrics)
+        else:
+            if text is not None:
+                media = read_dlmt_stream(text.splitlines(), metrics)
+            elif args.cache:
+                media = read_dlmt_file_cached(filename, metrics)
+            else:
+                media = read_dlmt_file(filename, metrics)
+            stroke_count = len(media.brushstrokes)
+            if args.render_cache is not None:
+                from .rendercache import DiskRenderCache
+                media.set_render_cache(DiskRenderCache(args.render_cache))
+            if in_memory:
+                svgfilenames, contents = render_media_contents(media, args)
+            else:
+                svgfilenames = write_media(media, args)
+        if "png" in args.format and args.rasteriser == "python":
+            if in_memory:
+                png_contents = render_media_pngs(media, args)
+            else:
+                write_media_pngs(media, args)
+            if metrics is not None:
+                metrics.add_count("png", len(svgfilenames))
+        if metrics is not None:
+            metrics.add_count("strokes", stroke_count)
+            metrics.add_count("transform cache hits", media.transform_cache.hits)
+            metrics.add_count("transform cache misses", media.transform_cache.misses)
+        result = ConversionResult(filename, time() - started, None, svgfilenames, metrics)
+        result.contents = contents
+        result.png_contents = png_contents
+        return result
+    except Exception as error:
+        return ConversionResult(filename, time() - started, "{}: {}".format(type(error).__name__, error), [], metrics)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(get_profile_filename(args.profile, filename))
+
+def add_rasterise_metrics(results: List[ConversionResult], png_results: List[ConversionResult]):
+    # the png of each svg is rasterised after every conversion, its time goes to the source of the svg
+    sources = {output: result for result in results for output in result.outputs}
+    for png_result in png_results:
+        source = sources.get(png_result.filename)
+        if source is not None and source.metrics is not None:
+            source.metrics.add_time("rasterise", png_result.duration)
+            source.metrics.add_count("png", 1 if png_result.is_success() else 0)
+
+def to_metrics_obj(results: List[ConversionResult], png_results: List[ConversionResult], parameters: Dict[str, str], duration: float):
+    totals = ConversionMetrics()
+    files = []
+    for result in results:
+        fileobj = { "filename": result.filename, "duration": round(result.duration, 6), "error": result.error, "outputs": result.outputs }
+        if result.metrics is not None:
+            totals.merge(result.metrics)
+            fileobj.update(result.metrics.to_obj())
+        files.append(fileobj)
+    totalsobj = totals.to_obj()
+    totalsobj["specimens"] = len(results)
+    totalsobj["failures"] = len([result for result in results + png_results if not result.is_success()])
+    totalsobj["strokes per second"] = round(totals.counters.get("strokes", 0) / duration, 3) if duration > 0 else 0
+    return { "version": METRICS_VERSION, "parameters": parameters, "duration": round(duration, 6), "totals": totalsobj, "files": files }
+
+def print_progress(result: ConversionResult):
+    print("." if result.is_success() else "E", end="", flush=True)
+
+def print_summary(results: List[ConversionResult], label: str, slowest_count = 5):
+    failures = [result for result in results if not result.is_success()]
+    for result in failures:
+        print("Failed {}: {}".format(result.filename, result.error))
+    durations = sorted([(result.duration, result.filename) for result in results], reverse = True)
+    if len(durations) == 0:
+        return
+    print("{} {} of {} specimens: min {:.3f}s, median {:.3f}s, max {:.3f}s".format(label, len(results) - len(failures), len(results), durations[-1][0], durations[len(durations)//2][0], durations[0][0]))
+    for duration, filename in durations[:slowest_count]:
+        print("  {:.3f}s {}".format(duration, filename))
+
+def main():
+    started = time()
+
+    parser = argparse.ArgumentParser(description = 'Convert a Dalmatian Mask Tape media')
+    parser.add_argument("-i", "--indirectory", help="Directory containing the Dalmatian Mask Tape media files", required = True)
+    parser.add_argument("-o", "--outdirectory", help="Output directory", required = True)
+    parser.add_argument("-f", "--format", help="Image format (svg, png)", default = "svg")
+    parser.add_argument("-p", "--prefix", help="Prefix for the generated media files", default = "")
+    parser.add_argument("-W", "--width", help="The width of generated bitmap in pixels.", required = True)
+    parser.add_argument("-v", "--view", help="The view to export (default, cropped, all, i:0...)", default = "default")
+    parser.add_argument("-b", "--background", help="Background color", default = "white")
+    parser.add_argument("-n", "--numeric", help="Numeric backend used for rendering (fraction, float)", default = "fraction")
+    parser.add_argument("-m", "--mode", help="SVG rendering mode (paths, symbols)", default = "paths")
+    parser.add_argument("-e", "--engine", help="SVG rendering engine (python, numpy)", default = "python")
+    parser.add_argument("--lod", help="Level of detail: simplify each brush to the size it is drawn at and merge the brushstrokes smaller than a pixel (paths mode)", action = "store_true")
+    parser.add_argument("-c", "--cache", help="Keep a parsed binary copy (.dlmt.bin) next to each source, used while the source is unchanged", action = "store_true")
+    parser.add_argument("--render-cache", help="Directory of renderings keyed by the content of the media and the rendering parameters, reused instead of rendering again")
+    parser.add_argument("--incremental", help="Only convert the sources whose content or parameters changed since the last run, as recorded in {} in the output directory".format(MANIFEST_FILENAME), action = "store_true")
+    parser.add_argument("--metrics", help="Write the time of each stage, per file, and counters of brushstrokes and caches to this json file")
+    parser.add_argument("--profile", help="Write a cProfile capture of each conversion to this directory (<name>.dlmt.prof)")
+    parser.add_argument("--pipeline", help="Read, convert (in --jobs processes) and write the files in overlapping stages, with a bounded number of files in memory", action = "store_true")
+    parser.add_argument("-j", "--jobs", help="Number of files converted in parallel (0 for one per CPU core)", type = int, default = 1)
+    parser.add_argument("-r", "--rasteriser", help="Rasteriser of the png (inkscape, python). The python one renders each view directly, in the process converting the file", default = "inkscape")
+    parser.add_argument("--png-supersampling", help="Samples per pixel row of the python rasteriser, 1 for no anti-aliasing", type = int, default = 4)
+    parser.add_argument("--png-jobs", help="Number of concurrent Inkscape processes (0 for the same as --jobs)", type = int, default = 0)
+    parser.add_argument("--png-batch", help="Number of svg files exported by each Inkscape invocation", type = int, default = 1)
+    parser.add_argument("--png-timeout", help="Seconds before an Inkscape invocation is killed", type = float, default = 120)
+    args = parser.parse_args()
+
+    if NumericBackend.from_string(args.numeric) == NumericBackend.NOT_SUPPORTED:
+        parser.error("Numeric backend not supported: {}".format(args.numeric))
+    if SvgRenderingMode.from_string(args.mode) == SvgRenderingMode.NOT_SUPPORTED:
+        parser.error("Rendering mode not supported: {}".format(args.mode))
+    if SvgRenderingEngine.from_string(args.engine) == SvgRenderingEngine.NOT_SUPPORTED:
+        parser.error("Rendering engine not supported: {}".format(args.engine))
+    if args.rasteriser not in ["inkscape", "python"]:
+        parser.error("Rasteriser not supported: {}".format(args.rasteriser))
+    if args.rasteriser == "python":
+        from .raster import parse_color
+        try:
+            parse_color(args.background)
+        except ValueError as error:
+            parser.error(str(error))
+    if SvgRenderingEngine.from_string(args.engine) == SvgRenderingEngine.NUMPY and not is_vectorized_available():
+        print("NumPy is not installed, falling back to the python engine")
+
+    dlmtfiles = glob("{}/*.dlmt".format(args.indirectory))
+    if args.profile is not None:
+        os.makedirs(args.profile, exist_ok = True)
+
+    manifest = None
+    if args.incremental:
+        manifest = ConversionManifest.load(os.path.join(args.outdirectory, MANIFEST_FILENAME))
+        parameters = get_render_parameters(args)
+        digests = {filename: get_source_digest(filename).hex() for filename in dlmtfiles}
+        unchanged = set([filename for filename in dlmtfiles if manifest.is_fresh(filename, digests[filename], parameters)])
+        dlmtfiles = [filename for filename in dlmtfiles if filename not in unchanged]
+        print("Skipping {} unchanged specimens".format(len(unchanged)))
+
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+
+    results = []
+    png_results = []
+    if args.pipeline:
+        from .pipeline import run_pipeline
+        # png are rasterised by the writer stage as soon as the svg of a source are written
+        results, png_results = run_pipeline(dlmtfiles, args, jobs, args.png_jobs if args.png_jobs > 0 else jobs, print_progress)
+    elif jobs > 1:
+        with ProcessPoolExecutor(max_workers = jobs) as executor:
+            # map yields in submission order, so progress is reported in file order
+            for result in executor.map(convert_file, dlmtfiles, repeat(args)):
+                results.append(result)
+                print_progress(result)
+    else:
+        for filename in dlmtfiles:
+            result = convert_file(filename, args)
+            results.append(result)
+            print_progress(result)
+    print("")
+    print_summary(results, "Converted")
+
+    if "png" in args.format and args.pipeline:
+        print_summary(png_results, "Rasterised")
+    elif "png" in args.format and args.rasteriser == "inkscape":
+        svgfiles = [output for result in results for output in result.outputs]
+        png_results = write_png_files(svgfiles, args.background, jobs = args.png_jobs if args.png_jobs > 0 else jobs, timeout = args.png_timeout, batch_size = max(args.png_batch, 1), progress = print_progress)
+        print("")
+        print_summary(png_results, "Rasterised")
+        if args.metrics is not None:
+            add_rasterise_metrics(results, png_results)
+
+    if manifest is not None:
+        record_conversions(manifest, digests, parameters, results, png_results, "png" in args.format)
+
+    finished = time()
+    if args.metrics is not None:
+        write_metrics_file(args.metrics, to_metrics_obj(results, png_results, get_render_parameters(args), finished - started))
+    print("Took {} seconds thus {} second per specimen".format(finished-started, (finished-started)/max(len(dlmtfiles), 1)))
+    if len([result for result in results + png_results if not result.is_success()]) > 0:
+        sys.exit(1)
@@ -0,0 +1,108 @@
+from array import array
+from fractions import Fraction
+from typing import Dict, Hashable, List, Tuple
+
+FRACTION_MEMO_SIZE = 4096
+
+class FractionColumn:
+    # numerators and denominators as machine integers, falling back to a list of fractions for larger values
+    def __init__(self, memoized: bool = False):
+        self.numerators = array('q')
+        self.denominators = array('q')
+        self.values: List[Fraction] = None
+        # columns with few distinct values, like angles and scales, can reuse the fractions they hand out
+        self.memo: Dict[Tuple[int, int], Fraction] = {} if memoized else None
+
+    def __len__(self):
+        return len(self.denominators) if self.values is None else len(self.values)
+
+    @classmethod
+    def from_buffers(cls, numerators, denominators, memoized: bool = False):
+        # any integer sequences will do, like read-only memoryviews over a mapped file, until the first append
+        column = cls(memoized)
+        column.numerators = numerators
+        column.denominators = denominators
+        return column
+
+    @classmethod
+    def from_values(cls, values: List[Fraction], memoized: bool = False):
+        column = cls(memoized)
+        column.values = values
+        return column
+
+    def append(self, value: Fraction):
+        self.append_ratio(value.numerator, value.denominator, value)
+
+    def append_ratio(self, numerator: int, denominator: int, value: Fraction = None):
+        # numerator and denominator already normalised, as in a Fraction
+        if not isinstance(self.denominators, array):
+            self.numerators = array('q', self.numerators)
+            self.denominators = array('q', self.denominators)
+        if self.values is None:
+            try:
+                self.numerators.append(numerator)
+            except OverflowError:
+                self.values = [Fraction(n, d) for n, d in zip(self.numerators, self.denominators)]
+                self.numerators = array('q')
+                self.denominators = array('q')
+            else:
+                try:
+                    self.denominators.append(denominator)
+                    return
+                except OverflowError:
+                    self.numerators.pop()
+                    self.values = [Fraction(n, d) for n, d in zip(self.numerators, self.denominators)]
+                    self.numerators = array('q')
+                    self.denominators = array('q')
+        self.values.append(Fraction(numerator, denominator) if value is None else value)
+
+    def __getitem__(self, i: int)->Fraction:
+        if self.values is not None:
+            return self.values[i]
+        if self.memo is None:
+            return Fraction(self.numerators[i], self.denominators[i])
+        key = (self.numerators[i], self.denominators[i])
+        value = self.memo.get(key)
+        if value is None:
+            if len(self.memo) >= FRACTION_MEMO_SIZE:
+                self.memo.clear()
+            value = Fraction(key[0], key[1])
+            self.memo[key] = value
+        return value
+
+    def to_float(self, i: int)->float:
+        if self.values is None:
+            return self.numerators[i] / self.denominators[i]
+        return float(self.values[i])
+
+class InternedColumn:
+    # repeated values are stored once, each row only keeping the index of its value
+    def __init__(self):
+        self.values: List[Hashable] = []
+        self.indexes: Dict[Hashable, int] = {}
+        self.rows = array('l')
+
+    def __len__(self):
+        return len(self.rows)
+
+    @classmethod
+    def from_buffer(cls, values: List[Hashable], rows):
+        column = cls()
+        column.values = values
+        column.indexes = {value: index for index, value in enumerate(values)}
+        column.rows = rows
+        return column
+
+    def append(self, value: Hashable)->int:
+        if not isinstance(self.rows, array):
+            self.rows = array('l', self.rows)
+        index = self.indexes.get(value)
+        if index is None:
+            index = len(self.values)
+            self.values.append(value)
+            self.indexes[value] = index
+        self.rows.append(index)
+        return index
+
+    def __getitem__(self, i: int):
+        return self.values[self.rows[i]]
@@ -0,0 +1,262 @@
+from math import ceil, floor, log2, sqrt
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+from .geometry import NumericBackend, SegmentShape, VPath, rotation_matrix
+from .model import DalmatianMedia, PageBrushstroke
+
+# Level of detail: a brushstroke is drawn with no more detail than its size on screen can show.
+# From LOD_FULL_DETAIL_SIZE pixels, the brush path is written unchanged.
+# Below, a curve whose control points are within LOD_TOLERANCE pixels of its chord becomes a line,
+# and the runs of lines are simplified with Douglas-Peucker, so that a path never gets more segments.
+# Below LOD_SUBPIXEL_SIZE, the brushstroke only adds its ink to the pixel it falls in,
+# and each pixel is drawn as a single square of the same area.
+LOD_TOLERANCE = 0.25
+LOD_FULL_DETAIL_SIZE = 64
+LOD_SUBPIXEL_SIZE = 1
+LOD_CURVE_STEPS = 8
+LOD_DOTS_PER_PATH = 256
+
+Point = Tuple[float, float]
+# ("M", pt), ("L", pt), ("Q", control, pt) or ("C", control1, control2, pt), in brush coordinates
+Command = Tuple
+
+def reflect(point: Point, center: Point)->Point:
+    return 2 * center[0] - point[0], 2 * center[1] - point[1]
+
+def to_point(v2d)->Point:
+    return float(v2d.x), float(v2d.y)
+
+def to_commands(vpath: VPath)->List[List[Command]]:
+    # one closed ring per subpath, with the smooth beziers given the reflected control point svg would use
+    rings: List[List[Command]] = []
+    ring: List[Command] = []
+    current = start = (0.0, 0.0)
+    cubic_control, quadratic_control = None, None
+    for segment in vpath.segments:
+        action = segment.action
+        next_cubic, next_quadratic = None, None
+        if action == SegmentShape.CLOSE_PATH:
+            if len(ring) > 0:
+                rings.append(ring)
+            ring = []
+            current = start
+            cubic_control, quadratic_control = None, None
+            continue
+        if action not in [SegmentShape.MOVE_TO, SegmentShape.LINE_TO, SegmentShape.CUBIC_BEZIER, SegmentShape.SMOOTH_BEZIER, SegmentShape.QUADRATIC_BEZIER, SegmentShape.FLUID_BEZIER]:
+            continue
+        pt = to_point(segment.pt)
+        if action == SegmentShape.MOVE_TO:
+            if len(ring) > 0:
+                rings.append(ring)
+            ring = [("M", pt)]
+            start = pt
+        elif len(ring) == 0:
+            # svg starts a new subpath where the last one was closed
+            ring = [("M", current)]
+        if action == SegmentShape.LINE_TO:
+            ring.append(("L", pt))
+        elif action == SegmentShape.CUBIC_BEZIER:
+            next_cubic = to_point(segment.pt2)
+            ring.append(("C", to_point(segment.pt1), next_cubic, pt))
+        elif action == SegmentShape.SMOOTH_BEZIER:
+            next_cubic = to_point(segment.pt1)
+            ring.append(("C", reflect(cubic_control, current) if cubic_control is not None else current, next_cubic, pt))
+        elif action == SegmentShape.QUADRATIC_BEZIER:
+            next_quadratic = to_point(segment.pt1)
+            ring.append(("Q", next_quadratic, pt))
+        elif action == SegmentShape.FLUID_BEZIER:
+            next_quadratic = reflect(quadratic_control, current) if quadratic_control is not None else current
+            ring.append(("Q", next_quadratic, pt))
+        current = pt
+        cubic_control, quadratic_control = next_cubic, next_quadratic
+    if len(ring) > 0:
+        rings.append(ring)
+    return rings
+
+def cubic_points(start: Point, c1: Point, c2: Point, end: Point, steps: int = LOD_CURVE_STEPS)->List[Point]:
+    points = []
+    for step in range(1, steps + 1):
+        t = step / steps
+        u = 1 - t
+        a, b, c, d = u * u * u, 3 * u * u * t, 3 * u * t * t, t * t * t
+        points.append((a * start[0] + b * c1[0] + c * c2[0] + d * end[0], a * start[1] + b * c1[1] + c * c2[1] + d * end[1]))
+    return points
+
+def flatten_ring(ring: List[Command], steps: int = LOD_CURVE_STEPS)->List[Point]:
+    # the polygon of the ring, with each curve replaced by steps lines
+    points = [ring[0][-1]]
+    for command in ring[1:]:
+        if command[0] == "C":
+            points += cubic_points(points[-1], command[1], command[2], command[3], steps)
+        elif command[0] == "Q":
+            # the same curve as a cubic bezier
+            start, control, end = points[-1], command[1], command[2]
+            c1 = (start[0] + 2 * (control[0] - start[0]) / 3, start[1] + 2 * (control[1] - start[1]) / 3)
+            c2 = (end[0] + 2 * (control[0] - end[0]) / 3, end[1] + 2 * (control[1] - end[1]) / 3)
+            points += cubic_points(start, c1, c2, end, steps)
+        else:
+            points.append(command[-1])
+    return points
+
+def get_ring_area(ring: List[Command])->float:
+    # shoelace formula on the flattened ring
+    points = flatten_ring(ring)
+    area = 0.0
+    for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1]):
+        area += x1 * y2 - x2 * y1
+    return abs(area) / 2
+
+def get_square_distance_to_segment(point: Point, start: Point, end: Point)->float:
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    length = dx * dx + dy * dy
+    if length == 0:
+        t = 0.0
+    else:
+        t = max(0.0, min(1.0, ((point[0] - start[0]) * dx + (point[1] - start[1]) * dy) / length))
+    x, y = start[0] + t * dx - point[0], start[1] + t * dy - point[1]
+    return x * x + y * y
+
+def simplify_polyline(points: List[Point], tolerance: float)->List[Point]:
+    # Douglas-Peucker, with a stack instead of recursion; the first and last points are kept
+    if len(points) <= 2:
+        return list(points)
+    square_tolerance = tolerance * tolerance
+    kept = [False] * len(points)
+    kept[0], kept[-1] = True, True
+    stack = [(0, len(points) - 1)]
+    while len(stack) > 0:
+        first, last = stack.pop()
+        farthest, distance = None, square_tolerance
+        for i in range(first + 1, last):
+            d = get_square_distance_to_segment(points[i], points[first], points[last])
+            if d > distance:
+                farthest, distance = i, d
+        if farthest is not None:
+            kept[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+    return [point for point, keep in zip(points, kept) if keep]
+
+def simplify_ring(ring: List[Command], tolerance: float)->List[Command]:
+    # a bezier lies within the hull of its control points, so it is flat enough when they all are
+    square_tolerance = tolerance * tolerance
+    commands = [ring[0]]
+    current = ring[0][-1]
+    for command in ring[1:]:
+        end = command[-1]
+        if command[0] != "L" and max([get_square_distance_to_segment(control, current, end) for control in command[1:-1]]) <= square_tolerance:
+            command = ("L", end)
+        commands.append(command)
+        current = end
+    # the points of each run of lines, between two curves or the start of the ring
+    simplified = [commands[0]]
+    run = [commands[0][-1]]
+    for command in commands[1:]:
+        if command[0] == "L":
+            run.append(command[-1])
+            continue
+        simplified += [("L", point) for point in simplify_polyline(run, tolerance)[1:]]
+        simplified.append(command)
+        run = [command[-1]]
+    # the ring is closed by a line back to its start
+    simplified += [("L", point) for point in simplify_polyline(run + [commands[0][-1]], tolerance)[1:-1]]
+    return simplified
+
+def is_visible_ring(ring: List[Command])->bool:
+    return len(ring) >= 3 or any([command[0] in ["C", "Q"] for command in ring])
+
+class BrushDetailLevels:
+    # the simplified rings of a brush, for each tolerance of 2^-level brush units
+    def __init__(self, vpath: VPath):
+        self.rings = to_commands(vpath)
+        self.area = sum([get_ring_area(ring) for ring in self.rings])
+        self.levels: Dict[int, List[List[Command]]] = {}
+
+    def get_rings(self, level: int)->List[List[Command]]:
+        rings = self.levels.get(level)
+        if rings is None:
+            tolerance = 2.0 ** -level
+            rings = [ring for ring in [simplify_ring(ring, tolerance) for ring in self.rings] if is_visible_ring(ring)]
+            self.levels[level] = rings
+        return rings
+
+def get_detail_level(size: float)->int:
+    # the largest tolerance, as a power of 2, that stays under LOD_TOLERANCE pixels
+    return max(0, ceil(log2(size / LOD_TOLERANCE)))
+
+def to_ring_path_data(ring: List[Command], transform: Callable[[Point], Point])->str:
+    parts = []
+    for command in ring:
+        parts.append(command[0])
+        for point in command[1:]:
+            parts.append("%.3f %.3f" % transform(point))
+    parts.append("Z")
+    return " ".join(parts)
+
+def to_dot_path_data(x: float, y: float, side: float)->str:
+    half = side / 2
+    return "M %.3f %.3f L %.3f %.3f L %.3f %.3f L %.3f %.3f Z" % (x - half, y - half, x + half, y - half, x + half, y + half, x - half, y + half)
+
+def iter_lod_path_data(media: DalmatianMedia, renderConfig, indexes: Iterable[int], page_brushstrokes: List[PageBrushstroke] = None)->Iterator[str]:
+    # the "d" attribute of the brushstrokes, in the order of the indexes, then of the merged sub-pixel brushstrokes
+    store = media.brushstrokes
+    numeric_backend = renderConfig.numeric_backend
+    view = renderConfig.view
+    brush_page_ratio = float(media.headers.brush_page_ratio)
+    brush_width = float(renderConfig.brush_width)
+    dpu = float(renderConfig.view_pixel_width) / float(view.width)
+    ypixoffset = float(renderConfig.view_pixel_height)
+    viewx, viewy = float(view.xy.x), float(view.xy.y)
+    zoomxy, zoomwidth = view.xy.to_backend(numeric_backend), NumericBackend.to_number(numeric_backend, view.width)
+    brushes: Dict[str, BrushDetailLevels] = {}
+    # pixel -> ink area, and x and y weighted by area
+    dots: Dict[Tuple[int, int], List[float]] = {}
+    counts = { "lod full strokes": 0, "lod simplified strokes": 0, "lod sub-pixel strokes": 0 }
+    for i in indexes:
+        # a negative scale flips the brush, only its magnitude sets the detail
+        scale = store.scales.to_float(i)
+        size = brush_width * abs(scale)
+        if size >= LOD_FULL_DETAIL_SIZE:
+            counts["lod full strokes"] += 1
+            pbs = media.get_shared_page_brushstroke(i, numeric_backend, page_brushstrokes).zoom_to(zoomxy, zoomwidth)
+            yield pbs.vpath.to_svg_string(float(renderConfig.view_pixel_width), ypixoffset)
+            continue
+        brushid = store.get_brushid(i)
+        if brushid not in brushes:
+            brush = media.get_brush_by_id(brushid)
+            if brush is None:
+                continue
+            brushes[brushid] = BrushDetailLevels(brush.vpath)
+        levels = brushes[brushid]
+        tx = (store.xs.to_float(i) - viewx) * dpu
+        ty = ypixoffset - (store.ys.to_float(i) - viewy) * dpu
+        if size < LOD_SUBPIXEL_SIZE:
+            counts["lod sub-pixel strokes"] += 1
+            area = levels.area * size * size
+            dot = dots.setdefault((floor(tx), floor(ty)), [0.0, 0.0, 0.0])
+            dot[0] += area
+            dot[1] += tx * area
+            dot[2] += ty * area
+            continue
+        counts["lod simplified strokes"] += 1
+        cosa, sina = rotation_matrix(store.get_angle(i), NumericBackend.FLOAT)
+        k = scale * brush_page_ratio * dpu
+        rings = levels.get_rings(get_detail_level(size))
+        if len(rings) == 0:
+            continue
+        transform = lambda point: ((point[0] * cosa - point[1] * sina) * k + tx, ty - (point[0] * sina + point[1] * cosa) * k)
+        yield " ".join([to_ring_path_data(ring, transform) for ring in rings])
+    merged = []
+    for area, x, y in dots.values():
+        if area <= 0:
+            continue
+        merged.append(to_dot_path_data(x / area, y / area, sqrt(min(area, 1.0))))
+        if len(merged) >= LOD_DOTS_PER_PATH:
+            yield " ".join(merged)
+            merged = []
+    if len(merged) > 0:
+        yield " ".join(merged)
+    if media.metrics is not None:
+        for name, count in counts.items():
+            media.metrics.add_count(name, count)
+        media.metrics.add_count("lod dots", len(dots))
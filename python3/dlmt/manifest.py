@@ -0,0 +1,39 @@
+import json
+import os
+from typing import Dict, List
+
+MANIFEST_FILENAME = "dlmt-manifest.json"
+# bumped whenever the converter output changes for the same input and parameters
+MANIFEST_VERSION = 1
+
+class ConversionManifest:
+    # what was produced from which source content and parameters, kept in the output directory
+    def __init__(self, filename: str, entries: Dict[str, Dict] = {}):
+        self.filename = filename
+        self.entries = dict(entries)
+
+    @classmethod
+    def load(cls, filename: str):
+        try:
+            with open(filename, "r") as manifestfile:
+                content = json.load(manifestfile)
+        except (OSError, ValueError):
+            return cls(filename)
+        if not isinstance(content, dict) or content.get("version") != MANIFEST_VERSION:
+            return cls(filename)
+        return cls(filename, content.get("entries", {}))
+
+    def save(self):
+        tmpfilename = "{}.{}.tmp".format(self.filename, os.getpid())
+        with open(tmpfilename, "w") as manifestfile:
+            json.dump({ "version": MANIFEST_VERSION, "entries": self.entries }, manifestfile, indent = 1, sort_keys = True)
+        os.replace(tmpfilename, self.filename)
+
+    def is_fresh(self, source: str, digest: str, parameters: Dict[str, str])->bool:
+        entry = self.entries.get(os.path.abspath(source))
+        if entry is None or entry["digest"] != digest or entry["parameters"] != parameters:
+            return False
+        return all(os.path.exists(output) for output in entry["outputs"])
+
+    def record(self, source: str, digest: str, parameters: Dict[str, str], outputs: List[str]):
+        self.entries[os.path.abspath(source)] = { "digest": digest, "parameters": parameters, "outputs": [os.path.abspath(output) for output in outputs] }
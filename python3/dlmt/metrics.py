@@ -0,0 +1,110 @@
+import json
+import os
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+from typing import Dict, Iterable, Iterator, List
+
+METRICS_VERSION = 1
+STAGES = ["read", "header parse", "parse", "transform", "cull", "render cache", "xml build", "write", "rasterise"]
+
+class ConversionMetrics:
+    # Stages are timed exclusively: the time of a stage running inside another one,
+    # like the transform of a brushstroke while a view is culled, is only counted once.
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.views: Dict[str, Dict[str, int]] = {}
+        self.running: List[float] = []
+
+    def start(self)->float:
+        self.running.append(0.0)
+        return perf_counter()
+
+    def stop(self, stage: str, started: float):
+        elapsed = perf_counter() - started
+        nested = self.running.pop()
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed - nested
+        if len(self.running) > 0:
+            self.running[-1] += elapsed
+
+    @contextmanager
+    def timer(self, stage: str):
+        started = self.start()
+        try:
+            yield self
+        finally:
+            self.stop(stage, started)
+
+    def time_iter(self, stage: str, iterable: Iterable)->Iterator:
+        # only the time spent producing each value is counted, not the time of the consumer
+        iterator = iter(iterable)
+        while True:
+            started = self.start()
+            try:
+                value = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.stop(stage, started)
+            yield value
+
+    def add_time(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        return self
+
+    def add_count(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+        return self
+
+    def add_view_count(self, viewid: str, name: str, value: int = 1):
+        counters = self.views.setdefault(viewid, {})
+        counters[name] = counters.get(name, 0) + value
+        return self
+
+    def count_view_iter(self, viewid: str, name: str, iterable: Iterable)->Iterator:
+        count = 0
+        for value in iterable:
+            count += 1
+            yield value
+        self.add_view_count(viewid, name, count)
+
+    def merge(self, other):
+        for stage, seconds in other.stages.items():
+            self.add_time(stage, seconds)
+        for name, value in other.counters.items():
+            self.add_count(name, value)
+        for viewid, counters in other.views.items():
+            for name, value in counters.items():
+                self.add_view_count(viewid, name, value)
+        return self
+
+    def to_obj(self):
+        return {
+            "stages": {stage: round(seconds, 6) for stage, seconds in sorted(self.stages.items(), key = lambda item: get_stage_order(item[0]))},
+            "counters": dict(sorted(self.counters.items())),
+            "views": {viewid: dict(sorted(counters.items())) for viewid, counters in sorted(self.views.items())}
+        }
+
+    @classmethod
+    def from_obj(cls, metricsobj):
+        metrics = cls()
+        metrics.stages = dict(metricsobj["stages"])
+        metrics.counters = dict(metricsobj["counters"])
+        metrics.views = {viewid: dict(counters) for viewid, counters in metricsobj["views"].items()}
+        return metrics
+
+def get_stage_order(stage: str)->int:
+    return STAGES.index(stage) if stage in STAGES else len(STAGES)
+
+def timer(metrics: ConversionMetrics, stage: str):
+    # a no-op unless metrics are collected
+    return nullcontext() if metrics is None else metrics.timer(stage)
+
+def time_iter(metrics: ConversionMetrics, stage: str, iterable: Iterable)->Iterable:
+    return iterable if metrics is None else metrics.time_iter(stage, iterable)
+
+def write_metrics_file(filename: str, metricsobj):
+    tmpfilename = "{}.{}.tmp".format(filename, os.getpid())
+    with open(tmpfilename, "w") as metricsfile:
+        json.dump(metricsobj, metricsfile, indent = 2)
+    os.replace(tmpfilename, filename)
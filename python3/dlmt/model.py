@@ -0,0 +1,1013 @@
+from enum import Enum, auto
+from fractions import Fraction
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .cache import LruCache
+from .columns import FractionColumn, InternedColumn
+from .geometry import FLOAT_EDGE_MARGIN, NumericBackend, V2d, V2dList, VPath, VSegment
+from .metrics import timer
+from .text import as_exact_float_string, as_float_string, as_tidy_name, get_prefix, parse_dlmt_array, parse_dlmt_dict, to_dlmt_array, to_dlmt_dict
+from .tokenizer import BRUSH_GRAMMAR, BRUSHSTROKE_GRAMMAR, DlmtSyntaxError, match_brush, match_brushstroke, match_view, to_syntax_error, to_view_syntax_error
+
+# what the split based parsers raise on a malformed line
+SYNTAX_ERRORS = (AssertionError, ValueError, IndexError, ZeroDivisionError)
+
+# view i:1 lang en-gb xy 1/2 -1/3 width 1 height 1/2 flags OC tags all but [ i:1,i:2 ] -> everything
+class DlmtView:
+    __slots__ = ("id", "xy", "width", "height", "lang", "description", "flags", "everything", "tags", "tags_set")
+
+    def __init__(self, id: str, xy: V2d, width: Fraction, height: Fraction, everything: bool, tags: List[str], flags: str = "O", lang: str = "en", description: str = "" ):
+        self.id = id
+        self.xy = xy
+        self.width = width
+        self.height = height
+        self.lang = lang
+        self.description = description
+        self.flags = flags
+        self.everything = everything
+        self.tags = tags
+        self.tags_set = set(tags)
+    
+    @classmethod
+    def split_string(cls, line: str)->Tuple[str, ...]:
+        other, description  = line.split("->")
+        cmd, viewId, langKey, langId, xyKey, x, y, widthKey, width, heightKey, height, flagsKey, flags, tagsKey, everything, butKey, tagsInfo = other.split(" ", 16)
+        assert cmd == "view", line
+        assert langKey == "lang", line
+        assert xyKey == "xy", line
+        assert widthKey == "width", line
+        assert heightKey == "height", line
+        assert flagsKey == "flags", line
+        assert tagsKey == "tags", line
+        assert butKey == "but", line
+        return viewId, langId, x, y, width, height, flags, everything, tagsInfo, description
+
+    @classmethod
+    def from_string(cls, line: str):
+        fields = match_view(line)
+        try:
+            if fields is None:
+                fields = cls.split_string(line)
+            viewId, langId, x, y, width, height, flags, everything, tagsInfo, description = fields
+            return cls(id = viewId, xy = V2d.from_string(x + " " + y), width = Fraction(width), height = Fraction(height), lang = langId, description= description.strip(), flags = flags, everything = everything == "all", tags = parse_dlmt_array(tagsInfo) )
+        except SYNTAX_ERRORS as error:
+            raise to_view_syntax_error(line) from error
+
+    def to_string(self):
+        everything = "all" if self.everything else "none"
+        return "view {} lang {} xy {} width {} height {} flags {} tags {} but {} -> {}".format(self.id, self.lang, self.xy, self.width, self.height, self.flags, everything, to_dlmt_array(self.tags, sep=", ") , self.description)
+    
+    def __str__(self):
+        return self.to_string()
+    
+    def __repr__(self):
+        return self.to_string()
+
+    def __eq__(self, other):
+        return self.to_string() == str(other)
+
+    def accept_point(self, xy: V2d)->bool:
+        return xy.is_inside_rect(xy = self.xy, width = self.width, height = self.height)
+
+    def accept_tags(self, tags: Set[str])->bool:
+        if self.everything == True:
+            return len(tags.intersection(self.tags_set)) == 0
+        else:
+            return len(tags.intersection(self.tags_set)) > 0
+
+# tag i:1 lang en-gb same-as [ geospecies:bioclasses/P632y ] -> part of head
+class DlmtTagDescription:
+    __slots__ = ("id", "same_as", "lang", "description")
+
+    def __init__(self, id: str, same_as: List[str] = [], lang: str = "en", description: str = "" ):
+        self.id = id
+        self.same_as = same_as
+        self.lang = lang
+        self.description = description
+    
+    @classmethod
+    def from_string(cls, line: str):
+        other, description  = line.split("->")
+        cmd, descId, langKey, langId, sameAsKey, sameAsInfo = other.split(" ", 5)
+        assert cmd == "tag", line
+        assert langKey == "lang", line
+        assert sameAsKey == "same-as", line
+        
+        return cls(id = descId, same_as= parse_dlmt_array(sameAsInfo), lang = langId, description= description.strip())
+
+    def to_string(self):
+        return "tag {} lang {} same-as {} -> {}".format(self.id, self.lang, to_dlmt_array(self.same_as, sep=", "), self.description)
+    
+    def __str__(self):
+        return self.to_string()
+    
+    def __repr__(self):
+        return self.to_string()
+
+    def __eq__(self, other):
+        return self.to_string() == str(other)
+        
+# brush i:1 ext-id brushes:abc3F path [ M -1/3 1/3, l 2/3 0/1, l 0/1 2/3, l -2/3 0/1 ]
+class DlmtBrush:
+    __slots__ = ("id", "ext_id", "vpath")
+
+    def __init__(self, id: str, ext_id:str, vpath: VPath):
+        self.id = id
+        self.ext_id = ext_id
+        self.vpath = vpath
+    
+    @classmethod
+    def split_string(cls, line: str)->Tuple[str, str, str]:
+        cmd, brushId, extIdKey, extId, pathKey, other = line.split(" ", 5 )
+        assert cmd == "brush", line
+        assert extIdKey == "ext-id", line
+        assert pathKey == "path", line
+        return brushId, extId, other
+
+    @classmethod
+    def from_string(cls, line: str):
+        fields = match_brush(line)
+        try:
+            if fields is None:
+                fields = cls.split_string(line)
+        except SYNTAX_ERRORS as error:
+            raise to_syntax_error(line, BRUSH_GRAMMAR, "brush") from error
+        brushId, extId, other = fields
+        try:
+            vpath = VPath.from_dalmatian_string(other)
+        except SYNTAX_ERRORS as error:
+            raise cls.to_path_syntax_error(line, other) from error
+        return cls(id = brushId, ext_id = extId, vpath = vpath)
+
+    @classmethod
+    def to_path_syntax_error(cls, line: str, other: str)->DlmtSyntaxError:
+        start = len(line) - len(other)
+        for part in other.replace("[", "").replace("]", "").strip().split(","):
+            try:
+                VSegment.from_dalmatian_string(part)
+            except SYNTAX_ERRORS:
+                return DlmtSyntaxError("Invalid brush: Unexpected path segment", line, max(start, line.find(part.strip(), start)))
+        return DlmtSyntaxError("Invalid brush: Unexpected path", line, start)
+
+    def to_string(self):
+        return "brush {} ext-id {} path {}".format(self.id, self.ext_id, self.vpath.to_dalmatian_string())
+    
+    def __str__(self):
+        return self.to_string()
+    
+    def __repr__(self):
+        return self.to_string()
+
+    def __eq__(self, other):
+        return self.to_string() == str(other)
+
+    def get_neat_id(self):
+        return as_tidy_name(self.id)
+
+    def get_symbol_id(self):
+        return "brush-{}".format(self.get_neat_id())
+
+    def to_xml_svg_symbol(self, renderConfig):
+        from .renderer import brush_to_xml_svg_symbol
+        return brush_to_xml_svg_symbol(self, renderConfig)
+
+# brushstroke i:1 xy 1/15 1/100 scale 1/10 angle 0/1 tags [ i:1 ]
+class DlmtBrushstroke:
+    __slots__ = ("brushid", "xy", "scale", "angle", "tags", "tags_set")
+
+    def __init__(self, brushid: str, xy: V2d, scale: Fraction, angle: Fraction, tags: List[str] = []):
+        self.brushid = brushid
+        self.xy = xy
+        self.scale = scale
+        self.angle = angle
+        self.tags = tags
+        self.tags_set = set(tags)
+    
+    @classmethod
+    def split_string(cls, line: str)->Tuple[str, V2d, Fraction, Fraction, List[str]]:
+        cmd, brushId, xyKey, x, y, scaleKey, scale, angleKey, angle, tagsKey, tagsInfo = line.split(" ", 10 )
+        assert cmd == "brushstroke", line
+        assert xyKey == "xy", line
+        assert scaleKey == "scale", line
+        assert angleKey == "angle", line
+        assert tagsKey == "tags", line
+        
+        return brushId, V2d.from_string(x + " " + y), Fraction(scale), Fraction(angle), parse_dlmt_array(tagsInfo)
+
+    @classmethod
+    def parse_string(cls, line: str)->Tuple[str, V2d, Fraction, Fraction, List[str]]:
+        matched = match_brushstroke(line)
+        if matched is None:
+            try:
+                return cls.split_string(line)
+            except SYNTAX_ERRORS as error:
+                raise to_syntax_error(line, BRUSHSTROKE_GRAMMAR, "brushstroke") from error
+        brushId, ratios, tags = matched
+        x, y, scale, angle = [Fraction(n, d) for n, d in ratios]
+        return brushId, V2d(x, y), scale, angle, list(tags)
+
+    @classmethod
+    def from_string(cls, line: str):
+        brushid, xy, scale, angle, tags = cls.parse_string(line)
+        return cls(brushid = brushid, xy = xy, scale = scale, angle = angle, tags = tags)
+
+    def to_string(self):
+        return "brushstroke {} xy {} scale {} angle {} tags {}".format(self.brushid, self.xy, self.scale, self.angle, to_dlmt_array(self.tags, sep=", "))
+
+    def __str__(self):
+        return self.to_string()
+    
+    def __repr__(self):
+        return self.to_string()
+        
+    def __eq__(self, other):
+        return self.to_string() == str(other)
+
+    def get_degree_angle_string(self):
+        return as_float_string(self.angle*360)
+
+    def get_scale_string(self):
+        return as_exact_float_string(self.scale)
+
+    def get_neat_brush_id(self):
+        return as_tidy_name(self.brushid)
+
+    def get_tags_set(self):
+        return self.tags_set
+
+    def get_symbol_id(self):
+        return "brush-{}".format(self.get_neat_brush_id())
+
+    def to_xml_svg_use(self, renderConfig):
+        from .renderer import brushstroke_to_xml_svg_use
+        return brushstroke_to_xml_svg_use(self, renderConfig)
+
+class BrushstrokeStore:
+    # Columnar brushstrokes: a DlmtBrushstroke is only created on access, as a copy,
+    # while rendering reads the columns by index.
+    def __init__(self, brushstrokes: Iterable[DlmtBrushstroke] = []):
+        self.brushids = InternedColumn()
+        self.xs = FractionColumn()
+        self.ys = FractionColumn()
+        self.scales = FractionColumn(memoized = True)
+        self.angles = FractionColumn(memoized = True)
+        self.tags = InternedColumn()
+        self.tags_sets: List[Set[str]] = []
+        for brushstroke in brushstrokes:
+            self.append(brushstroke)
+
+    @classmethod
+    def from_columns(cls, brushids: InternedColumn, xs: FractionColumn, ys: FractionColumn, scales: FractionColumn, angles: FractionColumn, tags: InternedColumn):
+        store = cls()
+        store.brushids = brushids
+        store.xs = xs
+        store.ys = ys
+        store.scales = scales
+        store.angles = angles
+        store.tags = tags
+        store.tags_sets = [set(value) for value in tags.values]
+        return store
+
+    def __len__(self):
+        return len(self.brushids)
+
+    def append_fields(self, brushid: str, xy: V2d, scale: Fraction, angle: Fraction, tags: List[str]):
+        self.brushids.append(brushid)
+        self.xs.append(xy.x)
+        self.ys.append(xy.y)
+        self.scales.append(scale)
+        self.angles.append(angle)
+        if self.tags.append(tuple(tags)) == len(self.tags_sets):
+            self.tags_sets.append(set(tags))
+
+    def append(self, brushstroke: DlmtBrushstroke):
+        self.append_fields(brushstroke.brushid, brushstroke.xy, brushstroke.scale, brushstroke.angle, brushstroke.tags)
+
+    def append_string(self, line: str):
+        matched = match_brushstroke(line)
+        if matched is None:
+            self.append_fields(*DlmtBrushstroke.parse_string(line))
+            return
+        # canonical lines go in as integer ratios, without a Fraction for each value
+        brushid, ratios, tags = matched
+        self.brushids.append(brushid)
+        for column, (numerator, denominator) in zip([self.xs, self.ys, self.scales, self.angles], ratios):
+            column.append_ratio(numerator, denominator)
+        if self.tags.append(tags) == len(self.tags_sets):
+            self.tags_sets.append(set(tags))
+
+    def get_brushid(self, i: int)->str:
+        return self.brushids[i]
+
+    def get_xy(self, i: int)->V2d:
+        return V2d(self.xs[i], self.ys[i])
+
+    def get_float_xy(self, i: int)->V2d:
+        return V2d(self.xs.to_float(i), self.ys.to_float(i))
+
+    def get_scale(self, i: int)->Fraction:
+        return self.scales[i]
+
+    def get_angle(self, i: int)->Fraction:
+        return self.angles[i]
+
+    def get_tags(self, i: int)->List[str]:
+        return list(self.tags[i])
+
+    def get_tags_set(self, i: int)->Set[str]:
+        return self.tags_sets[self.tags.rows[i]]
+
+    def get_brushstroke(self, i: int)->DlmtBrushstroke:
+        return DlmtBrushstroke(brushid = self.get_brushid(i), xy = self.get_xy(i), scale = self.get_scale(i), angle = self.get_angle(i), tags = self.get_tags(i))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.get_brushstroke(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if i < 0 or i >= len(self):
+            raise IndexError("brushstroke index out of range")
+        return self.get_brushstroke(i)
+
+    def __iter__(self)->Iterator[DlmtBrushstroke]:
+        for i in range(len(self)):
+            yield self.get_brushstroke(i)
+
+    def __eq__(self, other):
+        return len(self) == len(other) and list(self) == list(other)
+
+    def __repr__(self):
+        return "BrushstrokeStore({} brushstrokes)".format(len(self))
+
+    def iter_placements(self)->Iterator[Tuple[str, float, float, Fraction]]:
+        for i in range(len(self)):
+            yield self.get_brushid(i), self.xs.to_float(i), self.ys.to_float(i), self.get_scale(i)
+
+class AxisDir(Enum):
+    POSITIVE = auto()
+    NEGATIVE = auto()
+    NOT_SUPPORTED = auto()
+    
+    @classmethod
+    def from_string(cls, value: str):
+        if value == "+":
+            return AxisDir.POSITIVE
+        elif value == "-":
+            return AxisDir.NEGATIVE
+        else:
+            return AxisDir.NOT_SUPPORTED
+    
+    @classmethod
+    def to_string(cls, value):
+        if value == AxisDir.POSITIVE:
+            return "+"
+        elif value == AxisDir.NEGATIVE:
+            return "-"
+        else:
+            return "E"
+
+class CoordinateType(Enum):
+    CARTESIAN = auto()
+    POLAR = auto()
+    NOT_SUPPORTED = auto()
+    
+    @classmethod
+    def from_string(cls, value: str):
+        if value == "cartesian":
+            return CoordinateType.CARTESIAN
+        elif value == "polar":
+            return CoordinateType.POLAR
+        else:
+            return CoordinateType.NOT_SUPPORTED
+    
+    @classmethod
+    def to_string(cls, value):
+        if value == CoordinateType.CARTESIAN:
+            return "cartesian"
+        elif value == CoordinateType.POLAR:
+            return "polar"
+        else:
+            return "E"
+
+# system cartesian right-dir + up-dir -
+class DlmtCoordinateSystem:
+    def __init__(self, right_dir: AxisDir, up_dir: AxisDir, coordinate_type: CoordinateType):
+        self.right_dir = right_dir
+        self.up_dir = up_dir
+        self.coordinate_type = coordinate_type
+    
+    @classmethod
+    def from_string(cls, line: str):
+        systemKey, cartesianKey, rightDirKey, rightDir, upDirKey, upDir = line.split()
+        assert systemKey == "system", line
+        assert cartesianKey == "cartesian", line
+        assert rightDirKey == "right-dir", line
+        assert upDirKey == "up-dir", line
+        
+        return cls(right_dir = AxisDir.from_string(rightDir), up_dir = AxisDir.from_string(upDir), coordinate_type = CoordinateType.from_string(cartesianKey))
+
+    def __str__(self):
+        return "system {} right-dir {} up-dir {}".format(CoordinateType.to_string(self.coordinate_type), AxisDir.to_string(self.right_dir), AxisDir.to_string(self.up_dir))
+    
+    def __repr__(self):
+       return "system {} right-dir {} up-dir {}".format(CoordinateType.to_string(self.coordinate_type), AxisDir.to_string(self.right_dir), AxisDir.to_string(self.up_dir))
+
+    def __eq__(self, other):
+        return self.right_dir == other.right_dir and self.up_dir == other.up_dir and self.coordinate_type == other.coordinate_type
+
+# system cartesian right-dir + up-dir - origin-x 1/2 origin-y 1/2
+class DlmtBrushCoordinateSystem:
+    def __init__(self, right_dir: AxisDir, up_dir: AxisDir, origin_x: Fraction, origin_y: Fraction, coordinate_type: CoordinateType):
+        self.right_dir = right_dir
+        self.up_dir = up_dir
+        self.origin_x = origin_x
+        self.origin_y = origin_y
+        self.coordinate_type = coordinate_type
+    
+    @classmethod
+    def from_string(cls, line: str):
+        systemKey, cartesianKey, rightDirKey, rightDir, upDirKey, upDir, originXKey, originX, originYKey, originY = line.split()
+        assert systemKey == "system", line
+        assert cartesianKey == "cartesian", line
+        assert rightDirKey == "right-dir", line
+        assert upDirKey == "up-dir", line
+        assert originXKey == "origin-x", line
+        assert originYKey == "origin-y", line
+        
+        return cls(right_dir = AxisDir.from_string(rightDir), up_dir = AxisDir.from_string(upDir), origin_x = Fraction(originX), origin_y = Fraction(originY), coordinate_type = CoordinateType.from_string(cartesianKey))
+
+    def __str__(self):
+        return "system {} right-dir {} up-dir {} origin-x {} origin-y {}".format(CoordinateType.to_string(self.coordinate_type), AxisDir.to_string(self.right_dir), AxisDir.to_string(self.up_dir), self.origin_x, self.origin_y)
+    
+    def __repr__(self):
+       return "system {} right-dir {} up-dir {} origin-x {} origin-y {}".format(CoordinateType.to_string(self.coordinate_type), AxisDir.to_string(self.right_dir), AxisDir.to_string(self.up_dir), self.origin_x, self.origin_y)
+
+    def __eq__(self, other):
+        return self.right_dir == other.right_dir and self.up_dir == other.up_dir and self.origin_x == other.origin_x and self.origin_y == other.origin_y and self.coordinate_type == other.coordinate_type
+
+class DlmtHeaders:
+    def __init__(self):
+        self.id_urn = ""
+        self.brush_page_ratio = Fraction("1/50")
+        self.page_coordinate_system = DlmtCoordinateSystem.from_string("system cartesian right-dir + up-dir -")
+        self.brush_coordinate_system = DlmtBrushCoordinateSystem.from_string("system cartesian right-dir + up-dir - origin-x 1/2 origin-y 1/2")
+        self.prefixes = { "github": "https://github.com/" }
+        self.require_sections  = {i: "0.5" for i in ["header", "views", "tag-descriptions", "brushes", "brushstrokes"]}
+        self.has_parts = []
+        self.url_refs = { }
+        self.text_refs = { }
+        self.copyright_year = 3000
+        self.is_family_friendly = True
+
+    def set_id_urn(self, value: str):
+        self.id_urn = value
+        return self
+
+    def set_copyright_year(self, year: int):
+        self.copyright_year = year
+        return self
+
+    def set_is_family_friendly(self, value: bool):
+        self.is_family_friendly = value
+        return self
+
+    def set_page_coordinate_system(self, value: DlmtCoordinateSystem):
+        self.page_coordinate_system = value
+        return self
+
+    def set_page_coordinate_system_string(self, value: str):
+        if value != "system cartesian right-dir + up-dir -":
+            raise Exception("Page coordinate system not supported yet: "+ value)
+        return self.set_page_coordinate_system(DlmtCoordinateSystem.from_string(value))
+
+    def set_brush_coordinate_system(self, value: DlmtBrushCoordinateSystem):
+        self.brush_coordinate_system = value
+        return self
+
+    def set_brush_coordinate_system_string(self, value: str):
+        if value != "system cartesian right-dir + up-dir - origin-x 1/2 origin-y 1/2":
+            raise Exception("Brush coordinate system not supported yet: " + value)
+        return self.set_brush_coordinate_system(DlmtBrushCoordinateSystem.from_string(value))
+
+    def set_brush_page_ratio(self, value: Fraction):
+        self.brush_page_ratio = value
+        return self
+
+    def set_brush_page_ratio_string(self, value: str):
+        return self.set_brush_page_ratio(Fraction(value))
+
+    def set_prefixes(self, prefixes: Dict[str, str]):
+        self.prefixes = prefixes
+        return self
+
+    def set_has_parts(self, has_parts: List[str]):
+        self.has_parts = has_parts
+        return self
+
+    def set_require_sections(self, sections: Dict[str, str]):
+        self.require_sections = sections
+        return self
+
+    def set_url(self, name: str, media_type: str, lang: str, url: str):
+        self.url_refs[(name.strip(), media_type.strip(), lang.strip())] = url.strip()
+        return self
+
+    def get_url(self, name: str, media_type: str, lang: str, defaultValue = None):
+        return self.url_refs.get((name.strip(), media_type.strip(), lang.strip()), defaultValue)
+
+    def set_text(self, name: str,lang: str, text: str):
+        self.text_refs[(name.strip(), lang.strip())] = text.strip()
+        return self
+
+    def get_text(self, name: str,lang: str, defaultValue = None):
+        return self.text_refs.get((name.strip(), lang.strip()), defaultValue)
+
+    @classmethod
+    def from_string_list(cls, lines: str):
+        result = cls()
+        for line in lines:
+            rawkey, rawvalue = line.split(":", 1)
+            key = rawkey.strip()
+            value = rawvalue.strip()
+            if key == "page-coordinate-system":
+                result.set_page_coordinate_system(DlmtCoordinateSystem.from_string(value))
+            elif key == "brush-coordinate-system":
+                result.set_brush_coordinate_system(DlmtBrushCoordinateSystem.from_string(value))
+            elif key == "brush-page-ratio":
+                result.set_brush_page_ratio(Fraction(value))
+            elif key == "id-urn":
+                result.set_id_urn(value)
+            elif key == "copyright-year":
+                result.set_copyright_year(int(value))
+            elif key == "is-family-friendly":
+                result.set_is_family_friendly(True if value.lower() == "yes" else False)
+            elif key == "prefixes":
+                result.set_prefixes(parse_dlmt_dict(value))
+            elif key == "require-sections":
+                result.set_require_sections(parse_dlmt_dict(value))
+            elif key == "has-parts":
+                result.set_has_parts(parse_dlmt_array(value))
+            elif key.count(" ") == 1:
+                name, lang = key.split()
+                if name in ["license", "attribution-name", "author", "brushes-license", "brushes-attribution-name", "name" ,"title", "description", "alternative-title"]:
+                    result.set_text(name, lang, value)
+            elif key.count(" ") == 2:
+                name, media_type, lang = key.split()
+                supported_media = ["html", "json", "rdf", "markdown", "nt", "ttl", "json-ld", "csv", "dlmt"]
+                if name in ["license-url", "attribution-url", "author-url", "brushes-license-url", "brushes-attribution-url", "metadata-url", "homepage-url", "repository-url", "thumbnail-url", "content-url"] and media_type in supported_media:
+                    result.set_url(name, media_type, lang, value)
+            else:
+                raise Exception("Header key [{}] is not supported".format(key))
+        return result
+    
+    def to_string_list(self)->List[str]:
+        results = []
+        results.append("id-urn: {}".format(self.id_urn))
+        results.append("require-sections: {}".format(to_dlmt_dict(self.require_sections)))
+        results.append("prefixes: {}".format(to_dlmt_dict(self.prefixes)))
+        results.append("page-coordinate-system: {}".format(self.page_coordinate_system))
+        results.append("brush-coordinate-system: {}".format(self.brush_coordinate_system))
+        results.append("brush-page-ratio: {}".format(self.brush_page_ratio))
+        for keydata, value in self.text_refs.items():
+            results.append("{} {}: {}".format(keydata[0], keydata[1], value))
+        for keydata, value in self.url_refs.items():
+            results.append("{} {} {}: {}".format(keydata[0], keydata[1], keydata[2], value))
+        results.append("copyright-year: {}".format(self.copyright_year))
+        results.append("is-family-friendly: {}".format("yes" if self.is_family_friendly else "no"))
+        results.append("has-parts: {}".format(to_dlmt_array(self.has_parts)))
+        return results
+
+    def to_string(self)->str:
+        return "\n".join(self.to_string_list())
+
+    def __str__(self):
+        return self.to_string()
+    
+    def __repr__(self):
+        return self.to_string()
+    
+    def __eq__(self, other):
+        thisone = (self.id_urn, self.copyright_year, self.brush_page_ratio, self.page_coordinate_system, self.brush_coordinate_system, self.prefixes, self.require_sections, self.url_refs, self.text_refs, self.is_family_friendly, self.has_parts)
+        otherone = (other.id_urn, other.copyright_year, other.brush_page_ratio, other.page_coordinate_system, other.brush_coordinate_system, other.prefixes, other.require_sections, other.url_refs, other.text_refs, other.is_family_friendly, other.has_parts)
+        return thisone == otherone
+
+    def get_short_prefixes(self)->Set[str]:
+        return set([key for key, _ in self.prefixes.items()])
+
+    def to_xml_svg(self, lang: str):
+        from .renderer import headers_to_xml_svg
+        return headers_to_xml_svg(self, lang)
+
+class PageBrushstroke:
+    __slots__ = ("vpath", "tags")
+
+    def __init__(self, vpath: VPath, tags = Set[str]):
+        self.vpath = vpath
+        self.tags = tags
+    
+    def to_string(self):
+        return "pbs path {} tags {}".format(self.vpath.to_dalmatian_string(), list(self.tags))
+    
+    def __str__(self):
+        return self.to_string()
+    
+    def __repr__(self):
+        return self.to_string()
+
+    def __eq__(self, other):
+        return self.vpath == other.vpath and self.tags == other.tags
+
+    def to_xml_svg(self, renderConfig):
+        from .renderer import page_brushstroke_to_xml_svg
+        return page_brushstroke_to_xml_svg(self, renderConfig)
+    
+    def zoom_to(self, xy: V2d, width: Fraction):
+        return PageBrushstroke(self.vpath.translate(-xy).scale(Fraction(1) / width), self.tags)
+
+TRANSFORM_CACHE_SIZE = 4096
+
+# the whole page, and the rectangle of the brushstrokes, for media rendered without one of their views
+default_view = DlmtView.from_string("view i:1 lang en xy 0 0 width 1 height 1 flags o tags all but [  ] -> everything")
+
+class DalmatianMedia:
+    
+    def __init__(self, headers: DlmtHeaders):
+        self.headers = headers
+        self.views_dict = {}
+        self.tag_descriptions = []
+        self.brushstrokes = BrushstrokeStore()
+        self.brushes_dict = {}
+        self.transform_cache = LruCache(TRANSFORM_CACHE_SIZE)
+        self.spatial_index = None
+        self.spatial_index_key = None
+        self.tag_index = None
+        self.metrics = None
+        self.render_cache = None
+        # sha256 of the content, for the keys of the render cache, when pinned by set_render_cache
+        self.digest = None
+        
+    def __repr__(self):
+        return "id: {}, views:{}, tags:{}, brushes:{}, brushstrokes:{}".format(self.headers.id_urn, len(self.views_dict), len(self.tag_descriptions), len(self.brushes_dict), len(self.brushstrokes))
+   
+    def __eq__(self, other):
+        thisone = (self.headers, self.views_dict, self.tag_descriptions, self.brushes_dict, self.brushstrokes)
+        otherone = (other.headers, other.views_dict, other.tag_descriptions, other.brushes_dict, other.brushstrokes)
+        return thisone == otherone
+
+    def set_metrics(self, metrics):
+        # a ConversionMetrics collecting the time spent in each stage, None to collect nothing
+        self.metrics = metrics
+        return self
+
+    def set_render_cache(self, render_cache, digest: str = None):
+        # a cache of renderings (see rendercache.py), None to render every time;
+        # a digest pins the one of get_digest(), for a media that is no longer changed
+        self.render_cache = render_cache
+        self.digest = digest
+        return self
+
+    def get_digest(self)->str:
+        # without a pinned digest, the content is hashed for each rendering, so that changes
+        # through the headers or the brushstroke store never get the rendering of the previous content
+        if self.digest is not None:
+            return self.digest
+        from .rendercache import get_media_digest
+        return get_media_digest(self)
+
+    def set_views(self, views: List[DlmtView]):
+        self.views_dict = {view.id:view for view in views }
+        return self
+    
+    def add_view(self, view: DlmtView):
+        self.views_dict[view.id] = view
+        return self
+
+    def add_view_string(self, view: str):
+        return self.add_view(DlmtView.from_string(view))
+
+    def set_tag_descriptions(self, tag_descriptions: List[DlmtTagDescription]):
+        self.tag_descriptions = tag_descriptions
+        self.tag_index = None
+        return self
+
+    def add_tag_description(self, tag_description: DlmtTagDescription):
+        self.tag_descriptions.append(tag_description)
+        self.tag_index = None
+        return self
+
+    def add_tag_description_string(self, tag_description: str):
+        return self.add_tag_description(DlmtTagDescription.from_string(tag_description))
+
+    def set_brushes(self, brushes: List[DlmtBrush]):
+        self.brushes_dict = {brush.id:brush for brush in brushes }
+        self.transform_cache.clear()
+        self.spatial_index = None
+        return self
+
+    def add_brush(self, brush: DlmtBrush):
+        self.brushes_dict[brush.id] = brush
+        self.transform_cache.clear()
+        self.spatial_index = None
+        return self
+
+    def add_brush_string(self, brush: str):
+        return self.add_brush(DlmtBrush.from_string(brush))
+
+    def set_brushstrokes(self, brushstrokes: Iterable[DlmtBrushstroke]):
+        self.brushstrokes = brushstrokes if isinstance(brushstrokes, BrushstrokeStore) else BrushstrokeStore(brushstrokes)
+        self.spatial_index = None
+        self.tag_index = None
+        return self
+
+    def add_brushstroke(self, brushstroke: DlmtBrushstroke):
+        self.brushstrokes.append(brushstroke)
+        self.spatial_index = None
+        self.tag_index = None
+        return self
+
+    def add_brushstroke_string(self, brushstroke: str):
+        self.brushstrokes.append_string(brushstroke)
+        self.spatial_index = None
+        self.tag_index = None
+        return self
+
+    def get_brush_by_id(self, brushid: str):
+        return self.brushes_dict.get(brushid)
+
+    def get_sorted_brushes(self):
+        return sorted([brush for _, brush in self.brushes_dict.items()], key = lambda br: br.id)
+
+    def get_sorted_views(self):
+        return sorted([view for _, view in self.views_dict.items()], key = lambda v: v.id)
+
+    def to_obj(self):
+        return {
+            "headers": self.headers.to_string_list(),
+            "views": [str(view) for view in self.get_sorted_views()],
+            "tag-descriptions": [str(tag_desc) for tag_desc in self.tag_descriptions],
+            "brushes": [str(brush) for brush in self.get_sorted_brushes()],
+            "brushstrokes": [str(brushstroke) for brushstroke in self.brushstrokes]
+        }
+
+    def to_string_list(self, with_brushstrokes: bool = True):
+        lines = ["section header"]
+        lines += self.headers.to_string_list()
+        lines += ["--------"]
+        lines += ["section views"]
+        lines += [str(view) for view in self.get_sorted_views()]
+        lines += ["--------"]
+        lines += ["section tag-descriptions"]
+        lines += [str(tag_desc) for tag_desc in self.tag_descriptions]
+        lines += ["--------"]
+        lines += ["section brushes"]
+        lines += [str(brush) for brush in self.get_sorted_brushes()]
+        lines += ["--------"]
+        lines += ["section brushstrokes"]
+        if with_brushstrokes:
+            lines += [str(brushstroke) for brushstroke in self.brushstrokes]
+        return lines
+    
+    def to_string(self)->str:
+        return "\n".join(self.to_string_list())
+    
+    def __str__(self):
+        return self.to_string()
+    
+    @classmethod
+    def from_obj(cls, mediaobj):
+        headers = DlmtHeaders.from_string_list(mediaobj["headers"])
+        views = [DlmtView.from_string(view) for view in mediaobj["views"]]
+        tag_descriptions = [DlmtTagDescription.from_string(tagdesc) for tagdesc in mediaobj["tag-descriptions"]]
+        brushes = [DlmtBrush.from_string(brush) for brush in mediaobj["brushes"]]
+        brushstrokes = [DlmtBrushstroke.from_string(brushstroke) for brushstroke in mediaobj["brushstrokes"]]
+        return cls(headers).set_views(views).set_tag_descriptions(tag_descriptions).set_brushes(brushes).set_brushstrokes(brushstrokes)
+
+    @classmethod
+    def from_string(cls, content):
+        from .parser import read_dlmt_stream
+        return read_dlmt_stream(content.splitlines())
+
+    def to_binary(self, source_digest: bytes = b"")->bytes:
+        from .binary import media_to_binary
+        return media_to_binary(self, source_digest)
+
+    @classmethod
+    def from_binary(cls, buffer):
+        from .binary import media_from_binary
+        return media_from_binary(buffer)
+
+    def get_tag_ids(self)->Set[str]:
+        return set([tag.id for tag in self.tag_descriptions])
+
+    def get_brush_ids(self)->Set[str]:
+        return set([brush.id for _, brush in self.brushes_dict.items()])
+
+    def get_view_ids(self)->Set[str]:
+        return set([view.id for _, view in self.views_dict.items()])
+    
+    def get_used_brush_ids(self)->Set[str]:
+        return set(self.brushstrokes.brushids.values)
+
+    def get_used_tag_ids(self)->Set[str]:
+        return set([tagid for tags in self.brushstrokes.tags.values for tagid in tags])
+
+    def get_used_short_prefixes(self)->Set[str]:
+        return set(([get_prefix(same_as) for tag_desc in self.tag_descriptions for same_as in tag_desc.same_as]))
+    
+    def get_undeclared_short_prefixes(self)->Set[str]:
+        return self.get_used_short_prefixes().difference(self.headers.get_short_prefixes())
+
+    def get_undeclared_brush_ids(self)->Set[str]:
+        return self.get_used_brush_ids().difference(self.get_brush_ids())
+
+    def get_undeclared_tag_ids(self)->Set[str]:
+        return self.get_used_tag_ids().difference(self.get_tag_ids())
+
+    def get_brushstokes_points(self)-> V2dList:
+       return V2dList([self.brushstrokes.get_xy(i) for i in range(len(self.brushstrokes))]) 
+
+    def check_references(self):
+        missing_prefixes = self.get_undeclared_short_prefixes()
+        missing_brushids = self.get_undeclared_brush_ids()
+        missing_tagids = self.get_undeclared_tag_ids()
+        results = []
+        if len(missing_prefixes) > 0 :
+            results.append("Prefixes in tags are not declared: {}".format(list(missing_prefixes)))
+        if len(missing_brushids) > 0 :
+            results.append("Brush ids in brushstrokes are not declared: {}".format(list(missing_brushids)))
+        if len(missing_tagids) > 0 :
+            results.append("Tag ids in brushstrokes are not declared: {}".format(list(missing_tagids)))
+        return results
+    
+    def create_page_pixel_coordinate(self, viewid: str, view_pixel_width: int, numeric_backend: NumericBackend = NumericBackend.FRACTION, rendering_mode = None, rendering_engine = None, level_of_detail: bool = False):
+        return self.create_page_pixel_coordinate_with_view(view_pixel_width, self.views_dict[viewid], numeric_backend, rendering_mode, rendering_engine, level_of_detail)
+
+    def create_page_pixel_coordinate_with_view(self, view_pixel_width: int, view: DlmtView, numeric_backend: NumericBackend = NumericBackend.FRACTION, rendering_mode = None, rendering_engine = None, level_of_detail: bool = False):
+        from .renderer import SvgRenderingConfig, SvgRenderingEngine, SvgRenderingMode
+        return SvgRenderingConfig(self.headers, view, view_pixel_width, numeric_backend, rendering_mode or SvgRenderingMode.PATHS, rendering_engine or SvgRenderingEngine.PYTHON, level_of_detail)
+
+    def get_transformed_brush_path(self, brushid: str, angle: Fraction, scale: Fraction, numeric_backend: NumericBackend = NumericBackend.FRACTION)-> VPath:
+        key = (brushid, angle, scale, self.headers.brush_page_ratio, numeric_backend)
+        vpath = self.transform_cache.get(key)
+        if vpath is None:
+            # angles stay exact so that the truncated cos/sin coefficients are identical for every backend
+            brush_page_ratio = NumericBackend.to_number(numeric_backend, self.headers.brush_page_ratio)
+            vpath = self.get_brush_by_id(brushid).vpath.to_backend(numeric_backend).rotate(angle, numeric_backend).scale(brush_page_ratio).scale(NumericBackend.to_number(numeric_backend, scale))
+            self.transform_cache.put(key, vpath)
+        return vpath
+
+    def get_spatial_index(self):
+        from .spatial import BrushstrokeGridIndex
+        key = (len(self.brushstrokes), self.headers.brush_page_ratio)
+        if self.spatial_index is None or self.spatial_index_key != key:
+            brush_radiuses = {brush.id: brush.vpath.get_manhattan_radius() for _, brush in self.brushes_dict.items()}
+            self.spatial_index = BrushstrokeGridIndex.from_placements(self.brushstrokes.iter_placements(), brush_radiuses, self.headers.brush_page_ratio)
+            self.spatial_index_key = key
+        return self.spatial_index
+
+    def get_tag_index(self):
+        from .tags import BrushstrokeTagIndex
+        if self.tag_index is None or len(self.tag_index) != len(self.brushstrokes):
+            self.tag_index = BrushstrokeTagIndex.from_tag_rows([tag.id for tag in self.tag_descriptions], self.brushstrokes.tags.values, self.brushstrokes.tags.rows)
+        return self.tag_index
+
+    def iter_brushstroke_indexes_for_view(self, view: DlmtView)-> Iterator[Tuple[int, bool]]:
+        # only strokes accepted by the view tags, with True when the "O" flag is already known to hold
+        tag_index = self.get_tag_index()
+        tagfilter = tag_index.compile_view(view)
+        if "O" in view.flags:
+            masks = tag_index.masks
+            for i, inside in self.get_spatial_index().query(view.xy, view.width, view.height):
+                if tagfilter.accept(masks[i]):
+                    yield i, inside
+        else:
+            for i in tag_index.select(tagfilter):
+                yield i, True
+
+    def iter_accepted_brushstrokes(self, view: DlmtView, brushstrokes: Iterable[DlmtBrushstroke])-> Iterator[Tuple[DlmtBrushstroke, bool]]:
+        tag_index = self.get_tag_index()
+        tagfilter = tag_index.compile_view(view)
+        inside = "O" not in view.flags
+        for bs in brushstrokes:
+            if tagfilter.accept(tag_index.interner.to_mask(bs.tags)):
+                yield bs, inside
+
+    def to_page_brushstroke(self, bs: DlmtBrushstroke, numeric_backend: NumericBackend = NumericBackend.FRACTION)-> PageBrushstroke:
+        with timer(self.metrics, "transform"):
+            vpath = self.get_transformed_brush_path(bs.brushid, bs.angle, bs.scale, numeric_backend)
+            return PageBrushstroke(vpath.translate(bs.xy.to_backend(numeric_backend)), bs.tags_set)
+
+    def to_page_brushstroke_at(self, i: int, numeric_backend: NumericBackend = NumericBackend.FRACTION)-> PageBrushstroke:
+        with timer(self.metrics, "transform"):
+            store = self.brushstrokes
+            vpath = self.get_transformed_brush_path(store.get_brushid(i), store.get_angle(i), store.get_scale(i), numeric_backend)
+            xy = store.get_float_xy(i) if numeric_backend == NumericBackend.FLOAT else store.get_xy(i)
+            return PageBrushstroke(vpath.translate(xy), store.get_tags_set(i))
+
+    def create_shared_page_brushstrokes(self)-> List[PageBrushstroke]:
+        # filled on demand by the view iterators, so that several views transform each brushstroke only once
+        return [None] * len(self.brushstrokes)
+
+    def get_shared_page_brushstroke(self, i: int, numeric_backend: NumericBackend, page_brushstrokes: List[PageBrushstroke] = None)-> PageBrushstroke:
+        if page_brushstrokes is None:
+            return self.to_page_brushstroke_at(i, numeric_backend)
+        pbs = page_brushstrokes[i]
+        if pbs is None:
+            pbs = self.to_page_brushstroke_at(i, numeric_backend)
+            page_brushstrokes[i] = pbs
+        return pbs
+
+    def to_page_brushstroke_list(self, numeric_backend: NumericBackend = NumericBackend.FRACTION)-> List[PageBrushstroke]:
+        return list(self.iter_page_brushstrokes(numeric_backend))
+
+    def iter_page_brushstrokes(self, numeric_backend: NumericBackend = NumericBackend.FRACTION, brushstrokes: Iterable[DlmtBrushstroke] = None)-> Iterator[PageBrushstroke]:
+        if brushstrokes is None:
+            for i in range(len(self.brushstrokes)):
+                yield self.to_page_brushstroke_at(i, numeric_backend)
+        else:
+            for bs in brushstrokes:
+                yield self.to_page_brushstroke(bs, numeric_backend)
+
+    def check_view_margins(self, pbs: PageBrushstroke, view: DlmtView, numeric_backend: NumericBackend = NumericBackend.FRACTION)->Optional[bool]:
+        # None when rounded coordinates cannot decide, which only happens for points lying on the edge of the view
+        if numeric_backend == NumericBackend.FRACTION:
+            return pbs.vpath.is_mostly_inside_rect(view.xy, width = view.width, height = view.height)
+        margin = V2d(FLOAT_EDGE_MARGIN, FLOAT_EDGE_MARGIN)
+        xy = view.xy.to_backend(numeric_backend)
+        width = NumericBackend.to_number(numeric_backend, view.width)
+        height = NumericBackend.to_number(numeric_backend, view.height)
+        if pbs.vpath.is_mostly_inside_rect(xy + margin, width = width - 2*FLOAT_EDGE_MARGIN, height = height - 2*FLOAT_EDGE_MARGIN):
+            return True
+        if not pbs.vpath.is_mostly_inside_rect(xy - margin, width = width + 2*FLOAT_EDGE_MARGIN, height = height + 2*FLOAT_EDGE_MARGIN):
+            return False
+        return None
+
+    def is_mostly_inside_view(self, bs: DlmtBrushstroke, pbs: PageBrushstroke, view: DlmtView, numeric_backend: NumericBackend = NumericBackend.FRACTION)->bool:
+        inside = self.check_view_margins(pbs, view, numeric_backend)
+        if inside is None:
+            return self.to_page_brushstroke(bs).vpath.is_mostly_inside_rect(view.xy, width = view.width, height = view.height)
+        return inside
+
+    def is_mostly_inside_view_at(self, i: int, pbs: PageBrushstroke, view: DlmtView, numeric_backend: NumericBackend = NumericBackend.FRACTION)->bool:
+        inside = self.check_view_margins(pbs, view, numeric_backend)
+        if inside is None:
+            return self.to_page_brushstroke_at(i).vpath.is_mostly_inside_rect(view.xy, width = view.width, height = view.height)
+        return inside
+
+    def brushstroke_list_for_view(self, view: DlmtView, numeric_backend: NumericBackend = NumericBackend.FRACTION, page_brushstrokes: List[PageBrushstroke] = None) -> List[DlmtBrushstroke]:
+        return list(self.iter_brushstrokes_for_view(view, numeric_backend, page_brushstrokes = page_brushstrokes))
+
+    def iter_brushstrokes_for_view(self, view: DlmtView, numeric_backend: NumericBackend = NumericBackend.FRACTION, brushstrokes: Iterable[DlmtBrushstroke] = None, page_brushstrokes: List[PageBrushstroke] = None) -> Iterator[DlmtBrushstroke]:
+        if brushstrokes is not None:
+            for bs, inside in self.iter_accepted_brushstrokes(view, brushstrokes):
+                if inside or self.is_mostly_inside_view(bs, self.to_page_brushstroke(bs, numeric_backend), view, numeric_backend):
+                    yield bs
+            return
+        # only the visible brushstrokes are materialised from the store
+        for i in self.iter_visible_brushstroke_indexes(view, numeric_backend, page_brushstrokes):
+            yield self.brushstrokes.get_brushstroke(i)
+
+    def iter_visible_brushstroke_indexes(self, view: DlmtView, numeric_backend: NumericBackend = NumericBackend.FRACTION, page_brushstrokes: List[PageBrushstroke] = None) -> Iterator[int]:
+        for i, inside in self.iter_brushstroke_indexes_for_view(view):
+            if inside or self.is_mostly_inside_view_at(i, self.get_shared_page_brushstroke(i, numeric_backend, page_brushstrokes), view, numeric_backend):
+                yield i
+
+    def page_brushstroke_list_for_view(self, view: DlmtView, numeric_backend: NumericBackend = NumericBackend.FRACTION, page_brushstrokes: List[PageBrushstroke] = None) -> List[PageBrushstroke]:
+        return list(self.iter_page_brushstrokes_for_view(view, numeric_backend, page_brushstrokes = page_brushstrokes))
+
+    def iter_page_brushstrokes_for_view(self, view: DlmtView, numeric_backend: NumericBackend = NumericBackend.FRACTION, brushstrokes: Iterable[DlmtBrushstroke] = None, page_brushstrokes: List[PageBrushstroke] = None) -> Iterator[PageBrushstroke]:
+        xy = view.xy.to_backend(numeric_backend)
+        width = NumericBackend.to_number(numeric_backend, view.width)
+        if brushstrokes is not None:
+            for bs, inside in self.iter_accepted_brushstrokes(view, brushstrokes):
+                pbs = self.to_page_brushstroke(bs, numeric_backend)
+                if inside or self.is_mostly_inside_view(bs, pbs, view, numeric_backend):
+                    yield pbs.zoom_to(xy, width)
+            return
+        for i, inside in self.iter_brushstroke_indexes_for_view(view):
+            pbs = self.get_shared_page_brushstroke(i, numeric_backend, page_brushstrokes)
+            if inside or self.is_mostly_inside_view_at(i, pbs, view, numeric_backend):
+                yield pbs.zoom_to(xy, width)
+
+    def page_brushstroke_list_for_view_string(self, view: str) -> List[PageBrushstroke]:
+        return self.page_brushstroke_list_for_view(DlmtView.from_string(view))
+
+    def to_xml_svg(self, renderConfig):
+        from .renderer import media_to_xml_svg
+        return media_to_xml_svg(self, renderConfig)
+
+    def to_xml_svg_defs(self, renderConfig, brushids: Set[str]):
+        from .renderer import media_to_xml_svg_defs
+        return media_to_xml_svg_defs(self, renderConfig, brushids)
+
+    def to_xml_svg_file(self, renderConfig, file_or_filename, brushstrokes: Iterable[DlmtBrushstroke] = None):
+        from .renderer import write_xml_svg_file
+        write_xml_svg_file(self, renderConfig, file_or_filename, brushstrokes)
+
+    def to_xml_svg_files(self, renderConfigs: List, files_or_filenames: List):
+        from .renderer import write_xml_svg_files
+        write_xml_svg_files(self, renderConfigs, files_or_filenames)
+
+def get_cropped_view(media: DalmatianMedia)->DlmtView:
+    rect = media.get_brushstokes_points().get_containing_rect()
+    return DlmtView.from_string("view i:2 lang en xy {} width {} height {} flags o tags all but [  ] -> cropped ".format(rect.xy, rect.width, rect.height))
@@ -0,0 +1,109 @@
+from typing import Iterable, Iterator, List, Tuple
+
+from .model import DalmatianMedia, DlmtBrush, DlmtBrushstroke, DlmtHeaders, DlmtTagDescription, DlmtView
+from .metrics import ConversionMetrics, time_iter, timer
+from .tokenizer import DlmtSyntaxError
+
+DLMT_SECTIONS = ["header", "views", "tag-descriptions", "brushes", "brushstrokes"]
+SECTION_SEPARATOR = "--------"
+
+def iter_section_lines(lines: Iterable[str])-> Iterator[Tuple[str, str, int]]:
+    # section, stripped line and line number from 1
+    sections = iter(DLMT_SECTIONS)
+    section = None
+    expects_section = True
+    line_number = 0
+    line = ""
+    for line_number, rawline in enumerate(lines, 1):
+        line = rawline.strip()
+        if len(line) == 0:
+            continue
+        if line == SECTION_SEPARATOR:
+            if expects_section:
+                raise DlmtSyntaxError("Unexpected section separator", line, 0, line_number)
+            expects_section = True
+            continue
+        if expects_section:
+            section = next(sections, None)
+            if line != "section {}".format(section):
+                raise DlmtSyntaxError("Expected 'section {}'".format(section), line, 0, line_number)
+            expects_section = False
+            continue
+        yield section, line, line_number
+    if section != DLMT_SECTIONS[-1] or expects_section:
+        raise DlmtSyntaxError("Expected 'section {}' after the end".format(DLMT_SECTIONS[-1]), line, len(line), line_number)
+
+class DlmtStreamReader:
+    # Reads the media line by line: everything up to the brushes is kept,
+    # while brushstrokes, the bulk of a tape, can be consumed one at a time.
+    def __init__(self, lines: Iterable[str]):
+        self.section_lines = iter_section_lines(lines)
+        self.first_brushstroke_line = None
+        self.line_number = 0
+        self.media = None
+
+    def read_media(self)->DalmatianMedia:
+        if self.media is not None:
+            return self.media
+        header_lines: List[str] = []
+        views: List[DlmtView] = []
+        tag_descriptions: List[DlmtTagDescription] = []
+        brushes: List[DlmtBrush] = []
+        for section, line, self.line_number in self.section_lines:
+            try:
+                if section == "header":
+                    if ":" in line:
+                        header_lines.append(line)
+                elif section == "views":
+                    if "view " in line:
+                        views.append(DlmtView.from_string(line))
+                elif section == "tag-descriptions":
+                    if "tag " in line:
+                        tag_descriptions.append(DlmtTagDescription.from_string(line))
+                elif section == "brushes":
+                    if "brush " in line:
+                        brushes.append(DlmtBrush.from_string(line))
+                else:
+                    self.first_brushstroke_line = line
+                    break
+            except DlmtSyntaxError as error:
+                raise error.set_line_number(self.line_number)
+        self.media = DalmatianMedia(DlmtHeaders.from_string_list(header_lines)).set_views(views).set_tag_descriptions(tag_descriptions).set_brushes(brushes)
+        return self.media
+
+    def iter_brushstroke_lines(self)-> Iterator[str]:
+        # line_number follows the line last yielded
+        self.read_media()
+        if self.first_brushstroke_line is not None:
+            line, self.first_brushstroke_line = self.first_brushstroke_line, None
+            if "brushstroke " in line:
+                yield line
+        for _, line, self.line_number in self.section_lines:
+            if "brushstroke " in line:
+                yield line
+
+    def iter_brushstrokes(self)-> Iterator[DlmtBrushstroke]:
+        for line in self.iter_brushstroke_lines():
+            try:
+                brushstroke = DlmtBrushstroke.from_string(line)
+            except DlmtSyntaxError as error:
+                raise error.set_line_number(self.line_number)
+            yield brushstroke
+
+def read_dlmt_stream(lines: Iterable[str], metrics: ConversionMetrics = None)->DalmatianMedia:
+    # with metrics, the time spent reading the lines is told apart from the time spent parsing them
+    reader = DlmtStreamReader(time_iter(metrics, "read", lines))
+    with timer(metrics, "header parse"):
+        media = reader.read_media()
+    # brushstrokes go straight into the columns of the store, without a DlmtBrushstroke each
+    with timer(metrics, "parse"):
+        for line in reader.iter_brushstroke_lines():
+            try:
+                media.add_brushstroke_string(line)
+            except DlmtSyntaxError as error:
+                raise error.set_line_number(reader.line_number)
+    return media.set_metrics(metrics)
+
+def read_dlmt_file(filename: str, metrics: ConversionMetrics = None)->DalmatianMedia:
+    with open(filename, 'r') as dlmtfile:
+        return read_dlmt_stream(dlmtfile, metrics)
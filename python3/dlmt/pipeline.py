@@ -0,0 +1,106 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from time import time
+from typing import Callable, List, Tuple
+
+from .cli import ConversionResult, convert_file, get_png_filename, write_png_batch
+
+# Sources are read, converted and written by separate stages, so that the cpu keeps
+# converting while files are read from or written to a slow filesystem.
+# Each queue holds a few items per worker: a stage that gets ahead waits for the next one,
+# so at most a bounded number of sources and svg are held in memory.
+PIPELINE_QUEUE_SIZE = 2
+
+def read_source(filename: str)->str:
+    with open(filename, "r") as dlmtfile:
+        return dlmtfile.read()
+
+def write_contents(result: ConversionResult)->float:
+    started = time()
+    for filename, content in zip(result.outputs, result.contents):
+        with open(filename, "wb") as svgfile:
+            svgfile.write(content)
+    for filename, content in zip(result.outputs, result.png_contents or []):
+        with open(get_png_filename(filename), "wb") as pngfile:
+            pngfile.write(content)
+    result.contents = None
+    result.png_contents = None
+    return time() - started
+
+async def read_stage(filenames: List[str], args, read_queue: asyncio.Queue, io_executor: ThreadPoolExecutor, converters: int):
+    loop = asyncio.get_running_loop()
+    for filename in filenames:
+        started = time()
+        text, error = None, None
+        if not args.cache:
+            # with --cache, the worker maps the binary sidecar itself
+            # an unreadable or undecodable source fails on its own, like in convert_file
+            try:
+                text = await loop.run_in_executor(io_executor, read_source, filename)
+            except Exception as readerror:
+                error = "{}: {}".format(type(readerror).__name__, readerror)
+        await read_queue.put((filename, text, error, time() - started))
+    for _ in range(converters):
+        await read_queue.put(None)
+
+async def convert_stage(args, read_queue: asyncio.Queue, write_queue: asyncio.Queue, cpu_executor: ProcessPoolExecutor):
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await read_queue.get()
+        if item is None:
+            return
+        filename, text, error, read_duration = item
+        if error is not None:
+            await write_queue.put(ConversionResult(filename, read_duration, error))
+            continue
+        result = await loop.run_in_executor(cpu_executor, convert_file, filename, args, text, True)
+        result.duration += read_duration
+        if result.metrics is not None:
+            result.metrics.add_time("read", read_duration)
+        await write_queue.put(result)
+
+async def write_stage(args, write_queue: asyncio.Queue, io_executor: ThreadPoolExecutor, results: List[ConversionResult], png_results: List[ConversionResult], progress: Callable):
+    loop = asyncio.get_running_loop()
+    while True:
+        result = await write_queue.get()
+        if result is None:
+            return
+        if result.is_success():
+            try:
+                write_duration = await loop.run_in_executor(io_executor, write_contents, result)
+                result.duration += write_duration
+                if result.metrics is not None:
+                    result.metrics.add_time("write", write_duration)
+            except OSError as oserror:
+                result.error = "{}: {}".format(type(oserror).__name__, oserror)
+                result.contents = None
+                result.png_contents = None
+        results.append(result)
+        if progress is not None:
+            progress(result)
+        if "png" in args.format and args.rasteriser == "inkscape" and result.is_success():
+            batch = await loop.run_in_executor(io_executor, write_png_batch, result.outputs, args.background, args.png_timeout)
+            for png_result in batch:
+                if result.metrics is not None:
+                    result.metrics.add_time("rasterise", png_result.duration)
+                png_results.append(png_result)
+
+async def run_stages(filenames: List[str], args, jobs: int, writers: int, progress: Callable)->Tuple[List[ConversionResult], List[ConversionResult]]:
+    read_queue = asyncio.Queue(maxsize = jobs * PIPELINE_QUEUE_SIZE)
+    write_queue = asyncio.Queue(maxsize = writers * PIPELINE_QUEUE_SIZE)
+    results: List[ConversionResult] = []
+    png_results: List[ConversionResult] = []
+    with ThreadPoolExecutor(max_workers = 1 + writers) as io_executor, ProcessPoolExecutor(max_workers = jobs) as cpu_executor:
+        writer_tasks = [asyncio.create_task(write_stage(args, write_queue, io_executor, results, png_results, progress)) for _ in range(writers)]
+        await asyncio.gather(read_stage(filenames, args, read_queue, io_executor, jobs), *[convert_stage(args, read_queue, write_queue, cpu_executor) for _ in range(jobs)])
+        for _ in range(writers):
+            await write_queue.put(None)
+        await asyncio.gather(*writer_tasks)
+    # results come in the order they were written, the summaries expect the order of the sources
+    order = {filename: i for i, filename in enumerate(filenames)}
+    results.sort(key = lambda result: order[result.filename])
+    return results, png_results
+
+def run_pipeline(filenames: List[str], args, jobs: int, writers: int, progress: Callable = None)->Tuple[List[ConversionResult], List[ConversionResult]]:
+    # the conversion results, then the png results when png is one of the formats
+    return asyncio.run(run_stages(filenames, args, max(jobs, 1), max(writers, 1), progress))
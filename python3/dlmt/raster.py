@@ -0,0 +1,199 @@
+import struct
+import zlib
+from math import ceil, floor, sqrt
+from typing import Dict, Iterable, List, Tuple
+
+from .geometry import NumericBackend, rotation_matrix
+from .lod import BrushDetailLevels, Point, flatten_ring, get_detail_level
+from .metrics import timer
+from .model import DalmatianMedia
+
+# A png rasteriser for the monochrome brushstrokes of a view, without going through svg.
+# Each brushstroke is filled with the even-odd rule on its own, then drawn over the others.
+# With supersampling, every pixel row is sampled that many times, and each sample
+# covers the exact width of the spans it crosses, so edges are anti-aliased.
+RASTER_SUPERSAMPLING = 4
+RASTER_MAX_CURVE_STEPS = 32
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_COMPRESSION_LEVEL = 6
+PNG_GRAYSCALE = 0
+PNG_RGB = 2
+PNG_GRAYSCALE_ALPHA = 4
+
+NAMED_COLORS = {
+    "white": (255, 255, 255),
+    "black": (0, 0, 0),
+    "red": (255, 0, 0),
+    "green": (0, 128, 0),
+    "blue": (0, 0, 255),
+    "yellow": (255, 255, 0),
+    "gray": (128, 128, 128),
+    "grey": (128, 128, 128)
+}
+
+def parse_color(value: str)->Tuple[int, int, int]:
+    # None for a transparent background
+    color = value.strip().lower()
+    if color in ["transparent", "none"]:
+        return None
+    if color in NAMED_COLORS:
+        return NAMED_COLORS[color]
+    if color.startswith("#") and len(color) == 4:
+        return tuple([int(digit * 2, 16) for digit in color[1:]])
+    if color.startswith("#") and len(color) == 7:
+        return tuple([int(color[i:i+2], 16) for i in range(1, 7, 2)])
+    raise ValueError("Background color not supported: {}".format(value))
+
+def get_curve_steps(size: float)->int:
+    return max(2, min(RASTER_MAX_CURVE_STEPS, int(sqrt(size) * 2)))
+
+def add_span(row: Dict[int, float], start: float, end: float, weight: float, width: int):
+    # the coverage of [start, end) on each pixel of the row
+    start, end = max(start, 0.0), min(end, float(width))
+    if end <= start:
+        return
+    first, last = int(start), int(end)
+    if first == last:
+        row[first] = row.get(first, 0.0) + (end - start) * weight
+        return
+    row[first] = row.get(first, 0.0) + (first + 1 - start) * weight
+    for x in range(first + 1, last):
+        row[x] = row.get(x, 0.0) + weight
+    if last < width:
+        row[last] = row.get(last, 0.0) + (end - last) * weight
+
+def add_centered_span(row: Dict[int, float], start: float, end: float, width: int):
+    # without anti-aliasing, the pixels whose center is in [start, end)
+    for x in range(max(ceil(start - 0.5), 0), min(ceil(end - 0.5), width)):
+        row[x] = 1.0
+
+class MonochromeRaster:
+    def __init__(self, width: int, height: int, supersampling: int = RASTER_SUPERSAMPLING):
+        self.width = width
+        self.height = height
+        self.supersampling = max(supersampling, 1)
+        # ink coverage of each pixel, from 0 to 1
+        self.coverage = [0.0] * (width * height)
+
+    def fill(self, rings: List[List[Point]]):
+        # the even-odd fill of the rings, in pixels with y pointing down
+        edges = []
+        for ring in rings:
+            for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1]):
+                if y0 == y1:
+                    continue
+                if y0 > y1:
+                    x0, y0, x1, y1 = x1, y1, x0, y0
+                edges.append((y0, y1, x0, (x1 - x0) / (y1 - y0)))
+        if len(edges) == 0:
+            return
+        top = max(0, floor(min([edge[0] for edge in edges])))
+        bottom = min(self.height, ceil(max([edge[1] for edge in edges])))
+        samples = self.supersampling
+        weight = 1.0 / samples
+        antialiased = samples > 1
+        coverage = self.coverage
+        for y in range(top, bottom):
+            row: Dict[int, float] = {}
+            for sample in range(samples):
+                sy = y + (sample + 0.5) * weight
+                crossings = sorted([x0 + (sy - y0) * slope for y0, y1, x0, slope in edges if y0 <= sy < y1])
+                for i in range(0, len(crossings) - 1, 2):
+                    if antialiased:
+                        add_span(row, crossings[i], crossings[i + 1], weight, self.width)
+                    else:
+                        add_centered_span(row, crossings[i], crossings[i + 1], self.width)
+            base = y * self.width
+            for x, value in row.items():
+                value = min(value, 1.0)
+                ink = coverage[base + x]
+                coverage[base + x] = ink + value * (1.0 - ink)
+
+    def iter_rows(self, background: Tuple[int, int, int])->Iterable[bytes]:
+        # black ink over the background, or as the alpha of black when it is transparent
+        width = self.width
+        for y in range(self.height):
+            row = self.coverage[y * width:(y + 1) * width]
+            if background is None:
+                yield bytes([value for ink in row for value in (0, int(ink * 255 + 0.5))])
+            elif background[0] == background[1] == background[2]:
+                level = background[0]
+                yield bytes([int(level * (1.0 - ink) + 0.5) for ink in row])
+            else:
+                yield bytes([int(channel * (1.0 - ink) + 0.5) for ink in row for channel in background])
+
+    def to_png(self, background: Tuple[int, int, int])->bytes:
+        if background is None:
+            color_type = PNG_GRAYSCALE_ALPHA
+        elif background[0] == background[1] == background[2]:
+            color_type = PNG_GRAYSCALE
+        else:
+            color_type = PNG_RGB
+        return encode_png(self.width, self.height, color_type, self.iter_rows(background))
+
+def to_png_chunk(kind: bytes, data: bytes)->bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+
+def encode_png(width: int, height: int, color_type: int, rows: Iterable[bytes])->bytes:
+    # 8 bits per channel, no filter on the rows
+    compressor = zlib.compressobj(PNG_COMPRESSION_LEVEL)
+    data = [compressor.compress(b"\x00" + row) for row in rows]
+    data.append(compressor.flush())
+    header = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    return PNG_SIGNATURE + to_png_chunk(b"IHDR", header) + to_png_chunk(b"IDAT", b"".join(data)) + to_png_chunk(b"IEND", b"")
+
+def rasterise_view(media: DalmatianMedia, renderConfig, supersampling: int = RASTER_SUPERSAMPLING)->MonochromeRaster:
+    # the brushstrokes the svg of the config would show, simplified to a quarter of a pixel like the level of detail
+    store = media.brushstrokes
+    view = renderConfig.view
+    width = max(1, int(renderConfig.view_pixel_width))
+    height = max(1, int(round(float(renderConfig.view_pixel_height))))
+    raster = MonochromeRaster(width, height, supersampling)
+    brush_page_ratio = float(media.headers.brush_page_ratio)
+    brush_width = float(renderConfig.brush_width)
+    dpu = float(renderConfig.view_pixel_width) / float(view.width)
+    ypixoffset = float(renderConfig.view_pixel_height)
+    viewx, viewy = float(view.xy.x), float(view.xy.y)
+    brushes: Dict[str, BrushDetailLevels] = {}
+    polygons: Dict[Tuple[str, int, int], List[List[Point]]] = {}
+    for i in media.iter_visible_brushstroke_indexes(view, renderConfig.numeric_backend):
+        brushid = store.get_brushid(i)
+        if brushid not in brushes:
+            brush = media.get_brush_by_id(brushid)
+            if brush is None:
+                continue
+            brushes[brushid] = BrushDetailLevels(brush.vpath)
+        # a negative scale flips the brush, only its magnitude sets the detail
+        scale = store.scales.to_float(i)
+        size = brush_width * abs(scale)
+        if size <= 0:
+            continue
+        key = (brushid, get_detail_level(size), get_curve_steps(size))
+        rings = polygons.get(key)
+        if rings is None:
+            rings = [flatten_ring(ring, key[2]) for ring in brushes[brushid].get_rings(key[1])]
+            polygons[key] = rings
+        cosa, sina = rotation_matrix(store.get_angle(i), NumericBackend.FLOAT)
+        k = scale * brush_page_ratio * dpu
+        tx = (store.xs.to_float(i) - viewx) * dpu
+        ty = ypixoffset - (store.ys.to_float(i) - viewy) * dpu
+        raster.fill([[((x * cosa - y * sina) * k + tx, ty - (x * sina + y * cosa) * k) for x, y in ring] for ring in rings])
+    return raster
+
+def render_png(media: DalmatianMedia, renderConfig, background: str = "white", supersampling: int = RASTER_SUPERSAMPLING)->bytes:
+    color = parse_color(background)
+    def rasterise()->bytes:
+        with timer(media.metrics, "rasterise"):
+            return rasterise_view(media, renderConfig, supersampling).to_png(color)
+    if media.render_cache is None:
+        return rasterise()
+    from .rendercache import get_or_render, get_render_key
+    with timer(media.metrics, "render cache"):
+        key = get_render_key(media.get_digest(), renderConfig, "png", color, max(supersampling, 1))
+    return get_or_render(media, key, rasterise)
+
+def write_png_file(media: DalmatianMedia, renderConfig, filename: str, background: str = "white", supersampling: int = RASTER_SUPERSAMPLING):
+    content = render_png(media, renderConfig, background, supersampling)
+    with timer(media.metrics, "write"):
+        with open(filename, "wb") as pngfile:
+            pngfile.write(content)
@@ -0,0 +1,152 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, List
+
+from .metrics import timer
+
+# Renderings keyed by what determines them: the content of the media and the rendering config.
+# The key is a sha256, so the same tape rendered again, even from another copy of its source,
+# is a lookup in memory or on disk instead of a conversion.
+RENDER_CACHE_VERSION = 1
+RENDER_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+def get_media_digest(media)->str:
+    # the binary form holds every section of the media and is cheap to build from the columns
+    from .binary import media_to_binary
+    return hashlib.sha256(media_to_binary(media)).hexdigest()
+
+def get_render_key(media_digest: str, renderConfig, format: str = "svg", *parameters)->str:
+    # the fields of the config the output depends on, the headers being part of the media
+    fields = [RENDER_CACHE_VERSION, media_digest, format, renderConfig.view.to_string(), renderConfig.view_pixel_width, renderConfig.numeric_backend.name, renderConfig.rendering_mode.name, renderConfig.rendering_engine.name, renderConfig.level_of_detail] + list(parameters)
+    return hashlib.sha256("\n".join([str(field) for field in fields]).encode("utf-8")).hexdigest()
+
+def get_or_render(media, key: str, render: Callable[[], bytes])->bytes:
+    # the rendering from the cache of the media, rendered and stored on a miss
+    cache = media.render_cache
+    with timer(media.metrics, "render cache"):
+        content = cache.get(key)
+    if media.metrics is not None:
+        media.metrics.add_count("render cache hits" if content is not None else "render cache misses")
+    if content is None:
+        content = render()
+        with timer(media.metrics, "render cache"):
+            cache.put(key, content)
+    return content
+
+class MemoryRenderCache:
+    # least recently used renderings, up to a total size in bytes; shared by the threads of a server
+    def __init__(self, max_bytes: int = RENDER_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key: str)->bytes:
+        with self.lock:
+            content = self.entries.get(key)
+            if content is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return content
+
+    def put(self, key: str, content: bytes):
+        if len(content) > self.max_bytes:
+            return self
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.entries[key] = content
+            self.size += len(content)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last = False)
+                self.size -= len(evicted)
+                self.evictions += 1
+        return self
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+        return self
+
+    def to_obj(self):
+        return { "entries": len(self.entries), "bytes": self.size, "max bytes": self.max_bytes, "hits": self.hits, "misses": self.misses, "evictions": self.evictions }
+
+class DiskRenderCache:
+    # content addressed: <directory>/<first 2 digits of the key>/<key>, nothing is ever evicted
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+
+    def get_filename(self, key: str)->str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key: str)->bytes:
+        try:
+            with open(self.get_filename(key), "rb") as cachedfile:
+                content = cachedfile.read()
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return content
+
+    def put(self, key: str, content: bytes):
+        # written next to the target then renamed, so that a reader never gets a half written rendering;
+        # a read-only or full directory only costs the rendering its place in the cache
+        filename = self.get_filename(key)
+        tmpfilename = "{}.{}.{}.tmp".format(filename, os.getpid(), threading.get_ident())
+        try:
+            os.makedirs(os.path.dirname(filename), exist_ok = True)
+            with open(tmpfilename, "wb") as cachedfile:
+                cachedfile.write(content)
+            os.replace(tmpfilename, filename)
+        except OSError:
+            self.failures += 1
+            try:
+                os.remove(tmpfilename)
+            except OSError:
+                pass
+        return self
+
+    def to_obj(self):
+        return { "directory": self.directory, "hits": self.hits, "misses": self.misses, "failures": self.failures }
+
+class TieredRenderCache:
+    # looked up in order, typically memory then disk; a hit is copied to the tiers before it
+    def __init__(self, caches: List):
+        self.caches = caches
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str)->bytes:
+        for i, cache in enumerate(self.caches):
+            content = cache.get(key)
+            if content is not None:
+                self.hits += 1
+                for previous in self.caches[:i]:
+                    previous.put(key, content)
+                return content
+        self.misses += 1
+        return None
+
+    def put(self, key: str, content: bytes):
+        for cache in self.caches:
+            cache.put(key, content)
+        return self
+
+    def to_obj(self):
+        return { "hits": self.hits, "misses": self.misses, "tiers": [cache.to_obj() for cache in self.caches] }
@@ -0,0 +1,330 @@
+import io
+import os
+import xml.etree.ElementTree as ET
+from enum import Enum, auto
+from fractions import Fraction
+from math import floor
+from typing import Dict, Iterable, List, Set
+from xml.etree.ElementTree import ElementTree
+from xml.sax.saxutils import escape
+
+from .geometry import NumericBackend, SegmentShape, V2d
+from .metrics import ConversionMetrics, time_iter, timer
+from .model import DalmatianMedia, DlmtBrush, DlmtBrushstroke, DlmtHeaders, DlmtView, PageBrushstroke
+from .text import as_exact_float_string, as_float_string
+
+ET.register_namespace('', "http://www.w3.org/2000/svg")
+ET.register_namespace('xlink', "http://www.w3.org/1999/xlink")
+
+SVG_NAMESPACES = {
+    "xmlns": "http://www.w3.org/2000/svg",
+    "xmlns:xlink": "http://www.w3.org/1999/xlink",
+    "xmlns:dc": "http://purl.org/dc/elements/1.1/",
+    "xmlns:cc": "http://creativecommons.org/ns#",
+    "xmlns:rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "xmlns:svg": "http://www.w3.org/2000/svg"
+}
+
+STREAM_BUFFER_SIZE = 256
+# in thousandths of a pixel, from a rounding boundary, beyond the error of zooming exact coordinates with floats
+FLOAT_ZOOM_MARGIN = 1e-6
+
+def escape_xml_attribute(value: str)->str:
+    return escape(value, { '"': "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#09;" })
+
+def to_xml_start_tag(tag: str, attrib: Dict[str, str], closed = False)->str:
+    attributes = "".join([' {}="{}"'.format(key, escape_xml_attribute(value)) for key, value in attrib.items()])
+    return "<{}{}{}>".format(tag, attributes, " /" if closed else "")
+
+class SvgRenderingMode(Enum):
+    PATHS = auto()
+    SYMBOLS = auto()
+    NOT_SUPPORTED = auto()
+
+    @classmethod
+    def from_string(cls, value: str):
+        if value == "paths":
+            return SvgRenderingMode.PATHS
+        elif value == "symbols":
+            return SvgRenderingMode.SYMBOLS
+        else:
+            return SvgRenderingMode.NOT_SUPPORTED
+
+    @classmethod
+    def to_string(cls, value):
+        if value == SvgRenderingMode.PATHS:
+            return "paths"
+        elif value == SvgRenderingMode.SYMBOLS:
+            return "symbols"
+        else:
+            return "E"
+
+class SvgRenderingEngine(Enum):
+    PYTHON = auto()
+    NUMPY = auto()
+    NOT_SUPPORTED = auto()
+
+    @classmethod
+    def from_string(cls, value: str):
+        if value == "python":
+            return SvgRenderingEngine.PYTHON
+        elif value == "numpy":
+            return SvgRenderingEngine.NUMPY
+        else:
+            return SvgRenderingEngine.NOT_SUPPORTED
+
+    @classmethod
+    def to_string(cls, value):
+        if value == SvgRenderingEngine.PYTHON:
+            return "python"
+        elif value == SvgRenderingEngine.NUMPY:
+            return "numpy"
+        else:
+            return "E"
+
+class SvgRenderingConfig:
+    
+    def __init__(self, headers: DlmtHeaders, view: DlmtView, view_pixel_width: int, numeric_backend: NumericBackend = NumericBackend.FRACTION, rendering_mode: SvgRenderingMode = SvgRenderingMode.PATHS, rendering_engine: SvgRenderingEngine = SvgRenderingEngine.PYTHON, level_of_detail: bool = False):
+        self.headers = headers
+        self.view = view
+        self.numeric_backend = numeric_backend
+        self.rendering_mode = rendering_mode
+        self.rendering_engine = rendering_engine
+        # brushstrokes are simplified to their size in pixels, in paths mode (see lod.py)
+        self.level_of_detail = level_of_detail
+        self.view_pixel_width = Fraction(view_pixel_width)
+        self.zoomk = Fraction(1) / view.width # normalise view width to 1
+        self.view_pixel_height = self.zoomk * view.height * self.view_pixel_width
+        self.brush_width = self.zoomk * headers.brush_page_ratio * self.view_pixel_width
+
+    def to_page_view_box(self):
+        return "0 0 {}".format(V2d(self.view_pixel_width, self.view_pixel_height).to_float_string())
+
+    def to_brush_view_box(self):
+        return "{} {}".format(V2d(-self.brush_width/2, -self.brush_width/2).to_float_string(), V2d(self.brush_width, self.brush_width).to_float_string())
+
+    def get_brush_width_string(self):
+        return as_float_string(self.brush_width)
+
+    def to_pixel_string(self, xy: V2d):
+        pixel = (xy - self.view.xy) * (self.zoomk * self.view_pixel_width)
+        return pixel.to_svg_string(1, float(self.view_pixel_height))
+
+def headers_to_xml_svg(headers: DlmtHeaders, lang: str):
+    metadata = ET.Element('metadata', attrib = {})
+    rdfEl = ET.SubElement(metadata, 'rdf:RDF', attrib = {})
+    ccWork = ET.SubElement(rdfEl, 'cc:Work', attrib = {})
+    ET.SubElement(ccWork, 'dc:format', attrib = { }).text = "image/svg+xml"
+    ET.SubElement(ccWork, 'dc:type', attrib = { "rdf:resource": "http://purl.org/dc/dcmitype/StillImage" })
+    ET.SubElement(ccWork, 'dc:title', attrib = { }).text = headers.get_text("title", "")
+    ET.SubElement(ccWork, 'dc:description', attrib = { }).text = headers.get_text("description", lang, "")
+    ET.SubElement(ccWork, 'dc:source', attrib = { }).text = "source"
+    ET.SubElement(ccWork, 'dc:language', attrib = { }).text = lang
+    ET.SubElement(ccWork, 'dc:identifier', attrib = { }).text = headers.id_urn
+    ET.SubElement(ccWork, 'dc:date', attrib = { }).text = str(headers.copyright_year)
+    dcCreator = ET.SubElement(ccWork, 'dc:creator', attrib = { })
+    ccAgent = ET.SubElement(dcCreator, 'cc:Agent', attrib = { })
+    ET.SubElement(ccAgent, 'dc:title', attrib = { }).text = headers.get_text("creator", lang, "")
+    ET.SubElement(ccWork, 'cc:license', attrib = { "rdf:resource": headers.get_url("license-url", "html", lang, "https://creativecommons.org/licenses/by-sa/4.0/legalcode")})
+    return metadata
+
+def brush_to_xml_svg_symbol(brush: DlmtBrush, renderConfig: SvgRenderingConfig):
+    # no viewBox: the symbol is drawn in brush pixels centered on the origin of each use
+    symbol = ET.Element('symbol', attrib = { "id": brush.get_symbol_id(), "overflow": "visible" })
+    ET.SubElement(symbol, 'path', attrib = { "d": brush.vpath.to_svg_string(float(renderConfig.brush_width), 0.0) })
+    return symbol
+
+def brushstroke_to_xml_svg_use(brushstroke: DlmtBrushstroke, renderConfig: SvgRenderingConfig):
+    # the brush y axis points up like the page, while svg points down, hence the negative rotation
+    transforms = ["translate({})".format(renderConfig.to_pixel_string(brushstroke.xy))]
+    if brushstroke.angle != 0:
+        transforms.append("rotate({})".format(as_exact_float_string(-brushstroke.angle*360)))
+    if brushstroke.scale != 1:
+        transforms.append("scale({})".format(brushstroke.get_scale_string()))
+    return ET.Element('use', attrib = { "xlink:href": "#{}".format(brushstroke.get_symbol_id()), "transform": " ".join(transforms) })
+
+def page_brushstroke_to_xml_svg(pbs: PageBrushstroke, renderConfig: SvgRenderingConfig):
+    element = ET.Element('path', attrib = { "d": pbs.vpath.to_svg_string(float(renderConfig.view_pixel_width), float(renderConfig.view_pixel_height) ) })
+    return element
+
+def media_to_xml_svg(media: DalmatianMedia, renderConfig: SvgRenderingConfig)->ElementTree:
+    svg = ET.Element('svg', attrib = get_svg_attributes(renderConfig))
+    svg.append(headers_to_xml_svg(media.headers, lang = "en"))
+    if renderConfig.rendering_mode == SvgRenderingMode.SYMBOLS:
+        brushstrokes = media.brushstroke_list_for_view(renderConfig.view, renderConfig.numeric_backend)
+        svg.append(media_to_xml_svg_defs(media, renderConfig, set([bs.brushid for bs in brushstrokes])))
+        for bs in brushstrokes:
+            svg.append(brushstroke_to_xml_svg_use(bs, renderConfig))
+    else:
+        for pbs in media.page_brushstroke_list_for_view(renderConfig.view, renderConfig.numeric_backend):
+            svg.append(page_brushstroke_to_xml_svg(pbs, renderConfig))
+    return ElementTree(svg)
+
+def media_to_xml_svg_defs(media: DalmatianMedia, renderConfig: SvgRenderingConfig, brushids: Set[str]):
+    defs = ET.Element('defs', attrib = {})
+    for brush in media.get_sorted_brushes():
+        if brush.id in brushids:
+            defs.append(brush_to_xml_svg_symbol(brush, renderConfig))
+    return defs
+
+def get_svg_attributes(renderConfig: SvgRenderingConfig)->Dict[str, str]:
+    attrib = dict(SVG_NAMESPACES)
+    attrib["viewBox"] = renderConfig.to_page_view_box()
+    return attrib
+
+def page_brushstroke_to_svg_string(pbs: PageBrushstroke, renderConfig: SvgRenderingConfig)->str:
+    return to_xml_start_tag('path', { "d": pbs.vpath.to_svg_string(float(renderConfig.view_pixel_width), float(renderConfig.view_pixel_height)) }, closed = True)
+
+class FloatViewZoom:
+    # Writes an exact page brushstroke in the pixels of a view with float arithmetic, instead of
+    # zooming its fractions first, so that the views sharing the page brushstrokes only format them.
+    # The floats are a few ulps from the exact values: a coordinate that close to a rounding boundary
+    # of the 3 decimals, like the ties of fractions over 400000 at 1000 pixels, is zoomed exactly instead.
+    def __init__(self, renderConfig: SvgRenderingConfig):
+        view = renderConfig.view
+        self.viewxy = view.xy
+        self.viewwidth = view.width
+        self.x = float(view.xy.x)
+        self.y = float(view.xy.y)
+        self.width = float(view.width)
+        self.dpu = float(renderConfig.view_pixel_width)
+        self.ypixoffset = float(renderConfig.view_pixel_height)
+
+    def is_safe(self, value: float)->bool:
+        scaled = abs(value) * 1000
+        # near zero, the sign written comes from the exact value
+        return scaled >= FLOAT_ZOOM_MARGIN and abs(scaled - floor(scaled) - 0.5) > FLOAT_ZOOM_MARGIN
+
+    def to_point_string(self, pt: V2d)->str:
+        # the same operations as zoom_to followed by V2d.to_svg_string
+        x = (float(pt.x) - self.x) / self.width * self.dpu
+        if not self.is_safe(x):
+            x = float((pt.x - self.viewxy.x) / self.viewwidth) * self.dpu
+        y = self.ypixoffset + -((float(pt.y) - self.y) / self.width * self.dpu)
+        if not self.is_safe(y):
+            y = self.ypixoffset + -(float((pt.y - self.viewxy.y) / self.viewwidth) * self.dpu)
+        return "{:.3f} {:.3f}".format(x, y)
+
+    def to_svg_string(self, vpath)->str:
+        # None for a path with segments of an unknown shape
+        parts = []
+        for segment in vpath.segments:
+            action = segment.action
+            parts.append(SegmentShape.to_string(action))
+            if action == SegmentShape.CLOSE_PATH:
+                continue
+            if action in [SegmentShape.MOVE_TO, SegmentShape.LINE_TO, SegmentShape.FLUID_BEZIER]:
+                points = [segment.pt]
+            elif action in [SegmentShape.SMOOTH_BEZIER, SegmentShape.QUADRATIC_BEZIER]:
+                points = [segment.pt1, segment.pt]
+            elif action == SegmentShape.CUBIC_BEZIER:
+                points = [segment.pt1, segment.pt2, segment.pt]
+            else:
+                return None
+            parts += [self.to_point_string(pt) for pt in points]
+        return " ".join(parts)
+
+def iter_zoomed_path_data(media: DalmatianMedia, renderConfig: SvgRenderingConfig, indexes: Iterable[int], page_brushstrokes: List[PageBrushstroke] = None)->Iterable[str]:
+    zoom = FloatViewZoom(renderConfig)
+    view = renderConfig.view
+    for i in indexes:
+        pbs = media.get_shared_page_brushstroke(i, renderConfig.numeric_backend, page_brushstrokes)
+        data = zoom.to_svg_string(pbs.vpath)
+        if data is None:
+            data = pbs.zoom_to(view.xy, view.width).vpath.to_svg_string(zoom.dpu, zoom.ypixoffset)
+        yield data
+
+def is_vectorized_available()->bool:
+    from .vectorized import is_available
+    return is_available()
+
+def iter_culled(media: DalmatianMedia, renderConfig: SvgRenderingConfig, iterable: Iterable)->Iterable:
+    # times and counts the brushstrokes kept for the view, when the media collects metrics
+    metrics = media.metrics
+    if metrics is None:
+        return iterable
+    metrics.add_view_count(renderConfig.view.id, "strokes in", len(media.brushstrokes))
+    return metrics.count_view_iter(renderConfig.view.id, "strokes out", metrics.time_iter("cull", iterable))
+
+def iter_svg_strings(media: DalmatianMedia, renderConfig: SvgRenderingConfig, brushstrokes: Iterable[DlmtBrushstroke] = None, page_brushstrokes: List[PageBrushstroke] = None)->Iterable[str]:
+    yield to_xml_start_tag('svg', get_svg_attributes(renderConfig))
+    yield ET.tostring(headers_to_xml_svg(media.headers, lang = "en"), encoding = "unicode")
+    if renderConfig.rendering_mode == SvgRenderingMode.SYMBOLS:
+        if brushstrokes is None:
+            # only references are kept, so that the defs can be restricted to the brushes in use
+            viewstrokes = list(iter_culled(media, renderConfig, media.iter_brushstrokes_for_view(renderConfig.view, renderConfig.numeric_backend, page_brushstrokes = page_brushstrokes)))
+            brushids = set([bs.brushid for bs in viewstrokes])
+        else:
+            viewstrokes = iter_culled(media, renderConfig, media.iter_brushstrokes_for_view(renderConfig.view, renderConfig.numeric_backend, brushstrokes, page_brushstrokes))
+            brushids = media.get_brush_ids()
+        yield ET.tostring(media_to_xml_svg_defs(media, renderConfig, brushids), encoding = "unicode")
+        for bs in viewstrokes:
+            yield ET.tostring(brushstroke_to_xml_svg_use(bs, renderConfig), encoding = "unicode")
+    elif renderConfig.level_of_detail and brushstrokes is None:
+        from .lod import iter_lod_path_data
+        indexes = iter_culled(media, renderConfig, media.iter_visible_brushstroke_indexes(renderConfig.view, renderConfig.numeric_backend, page_brushstrokes))
+        for data in iter_lod_path_data(media, renderConfig, indexes, page_brushstrokes):
+            yield to_xml_start_tag('path', { "d": data }, closed = True)
+    elif renderConfig.rendering_engine == SvgRenderingEngine.NUMPY and brushstrokes is None and is_vectorized_available():
+        from .vectorized import iter_svg_path_data
+        indexes = iter_culled(media, renderConfig, media.iter_visible_brushstroke_indexes(renderConfig.view, renderConfig.numeric_backend, page_brushstrokes))
+        for data in iter_svg_path_data(media, renderConfig, indexes):
+            yield to_xml_start_tag('path', { "d": data }, closed = True)
+    elif renderConfig.numeric_backend == NumericBackend.FRACTION and brushstrokes is None:
+        indexes = iter_culled(media, renderConfig, media.iter_visible_brushstroke_indexes(renderConfig.view, renderConfig.numeric_backend, page_brushstrokes))
+        for data in iter_zoomed_path_data(media, renderConfig, indexes, page_brushstrokes):
+            yield to_xml_start_tag('path', { "d": data }, closed = True)
+    else:
+        # also the fallback of the numpy engine and of the level of detail, when NumPy is not installed or brushstrokes are streamed
+        for pbs in iter_culled(media, renderConfig, media.iter_page_brushstrokes_for_view(renderConfig.view, renderConfig.numeric_backend, brushstrokes, page_brushstrokes)):
+            yield page_brushstroke_to_svg_string(pbs, renderConfig)
+    yield "</svg>"
+
+def write_svg_strings(strings: Iterable[str], svgfile, metrics: ConversionMetrics = None):
+    buffer = []
+    for value in strings:
+        buffer.append(value)
+        if len(buffer) >= STREAM_BUFFER_SIZE:
+            with timer(metrics, "write"):
+                svgfile.write("".join(buffer).encode("utf-8"))
+            buffer = []
+    with timer(metrics, "write"):
+        svgfile.write("".join(buffer).encode("utf-8"))
+
+def write_xml_svg_file(media: DalmatianMedia, renderConfig: SvgRenderingConfig, file_or_filename, brushstrokes: Iterable[DlmtBrushstroke] = None, page_brushstrokes: List[PageBrushstroke] = None):
+    if media.render_cache is not None and brushstrokes is None:
+        write_cached_xml_svg_file(media, renderConfig, file_or_filename, page_brushstrokes)
+        return
+    # streams the svg element by element instead of building the whole ElementTree first
+    strings = time_iter(media.metrics, "xml build", iter_svg_strings(media, renderConfig, brushstrokes, page_brushstrokes))
+    if isinstance(file_or_filename, (str, os.PathLike)):
+        with open(file_or_filename, "wb") as svgfile:
+            write_svg_strings(strings, svgfile, media.metrics)
+    else:
+        write_svg_strings(strings, file_or_filename, media.metrics)
+
+def write_cached_xml_svg_file(media: DalmatianMedia, renderConfig: SvgRenderingConfig, file_or_filename, page_brushstrokes: List[PageBrushstroke] = None):
+    # a miss is rendered in memory, to be stored, instead of being streamed to the file
+    from .rendercache import get_or_render, get_render_key
+    def render()->bytes:
+        output = io.BytesIO()
+        write_svg_strings(time_iter(media.metrics, "xml build", iter_svg_strings(media, renderConfig, None, page_brushstrokes)), output)
+        return output.getvalue()
+    with timer(media.metrics, "render cache"):
+        key = get_render_key(media.get_digest(), renderConfig)
+    content = get_or_render(media, key, render)
+    with timer(media.metrics, "write"):
+        if isinstance(file_or_filename, (str, os.PathLike)):
+            with open(file_or_filename, "wb") as svgfile:
+                svgfile.write(content)
+        else:
+            file_or_filename.write(content)
+
+def write_xml_svg_files(media: DalmatianMedia, renderConfigs: List[SvgRenderingConfig], files_or_filenames: List):
+    assert len(renderConfigs) == len(files_or_filenames), "Expected one file per rendering config"
+    # each view zooms its own copy, so the page brushstrokes can be shared by views of the same backend
+    shared = {}
+    for renderConfig, file_or_filename in zip(renderConfigs, files_or_filenames):
+        if renderConfig.numeric_backend not in shared:
+            shared[renderConfig.numeric_backend] = media.create_shared_page_brushstrokes()
+        write_xml_svg_file(media, renderConfig, file_or_filename, page_brushstrokes = shared[renderConfig.numeric_backend])
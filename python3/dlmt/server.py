@@ -0,0 +1,262 @@
+import argparse
+import io
+import json
+import os
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+from typing import Deque, Dict, List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from .cache import LruCache
+from .geometry import NumericBackend
+from .model import DalmatianMedia, DlmtView, PageBrushstroke, default_view, get_cropped_view
+from .parser import read_dlmt_file
+from .rendercache import DiskRenderCache, MemoryRenderCache, TieredRenderCache, get_media_digest
+from .renderer import SvgRenderingConfig, SvgRenderingEngine, SvgRenderingMode, write_xml_svg_file
+
+# A long running render service: parsed media stay in memory between requests,
+# with the transformed brush paths and page brushstrokes of their previous renders.
+# An entry is keyed by the path, modification time and size of its source,
+# so an edited source is parsed again on its next request.
+# Renderings can also be kept, by the content of the media and the parameters (see rendercache.py).
+SERVER_MEDIA_CACHE_SIZE = 16
+# the page brushstrokes kept for the cached media, in total: each one holds a transformed brush path
+SERVER_MAX_PAGE_BRUSHSTROKES = 1000000
+SERVER_RENDER_CACHE_MEGABYTES = 64
+SERVER_LATENCY_WINDOW = 1000
+SERVER_MAX_WIDTH = 20000
+SERVER_FORMATS = { "svg": "image/svg+xml", "png": "image/png" }
+
+class RenderRequestError(Exception):
+    def __init__(self, status: int, message: str):
+        self.status = status
+        self.message = message
+        super().__init__(message)
+
+class CachedMedia:
+    def __init__(self, media: DalmatianMedia):
+        self.media = media
+        # media caches are not thread safe, so the renders of a media are serialised
+        self.lock = threading.Lock()
+        # per numeric backend, filled on demand by the views
+        self.page_brushstrokes: Dict[NumericBackend, List[PageBrushstroke]] = {}
+
+    def get_page_brushstrokes(self, numeric_backend: NumericBackend)->List[PageBrushstroke]:
+        if numeric_backend not in self.page_brushstrokes:
+            self.page_brushstrokes[numeric_backend] = self.media.create_shared_page_brushstrokes()
+        return self.page_brushstrokes[numeric_backend]
+
+def get_latency_obj(latencies: Deque[float]):
+    # in milliseconds, over the last requests
+    values = sorted(latencies)
+    if len(values) == 0:
+        return { "count": 0 }
+    return {
+        "count": len(values),
+        "mean": round(1000 * sum(values) / len(values), 3),
+        "p50": round(1000 * values[len(values) // 2], 3),
+        "p95": round(1000 * values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+        "max": round(1000 * values[-1], 3)
+    }
+
+class RenderService:
+    def __init__(self, directory: str, cache_size: int = SERVER_MEDIA_CACHE_SIZE, render_cache = None, max_page_brushstrokes: int = SERVER_MAX_PAGE_BRUSHSTROKES):
+        self.directory = os.path.realpath(directory)
+        self.media_cache = LruCache(cache_size)
+        self.render_cache = render_cache
+        self.max_page_brushstrokes = max_page_brushstrokes
+        self.lock = threading.Lock()
+        # one lock per source, so that concurrent requests parse it only once
+        self.file_locks: Dict[str, threading.Lock] = {}
+        self.keys: Dict[str, Tuple[str, int, int]] = {}
+        self.requests = 0
+        self.errors = 0
+        self.latencies: Dict[str, Deque[float]] = { name: deque(maxlen = SERVER_LATENCY_WINDOW) for name in SERVER_FORMATS }
+
+    def get_filename(self, name: str)->str:
+        # only the sources of the served directory can be rendered
+        filename = os.path.realpath(os.path.join(self.directory, name))
+        if os.path.commonpath([self.directory, filename]) != self.directory or not filename.endswith(".dlmt"):
+            raise RenderRequestError(400, "Not a dlmt file of the served directory: {}".format(name))
+        if not os.path.isfile(filename):
+            raise RenderRequestError(404, "No such file: {}".format(name))
+        return filename
+
+    def get_media(self, filename: str)->CachedMedia:
+        stat = os.stat(filename)
+        key = (filename, stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            file_lock = self.file_locks.setdefault(filename, threading.Lock())
+        with file_lock:
+            with self.lock:
+                cached = self.media_cache.get(key)
+            if cached is not None:
+                return cached
+            media = read_dlmt_file(filename)
+            # the media of the server are never changed, so their digest is computed once
+            if self.render_cache is not None:
+                media.set_render_cache(self.render_cache, get_media_digest(media))
+            cached = CachedMedia(media)
+            with self.lock:
+                previous = self.keys.get(filename)
+                if previous is not None and previous != key:
+                    self.media_cache.remove(previous)
+                self.keys[filename] = key
+                self.media_cache.put(key, cached)
+            return cached
+
+    def get_retained_page_brushstrokes(self)->int:
+        return sum([len(page_brushstrokes) for cached in self.media_cache.entries.values() for page_brushstrokes in cached.page_brushstrokes.values()])
+
+    def get_page_brushstrokes(self, cached: CachedMedia, numeric_backend: NumericBackend)->List[PageBrushstroke]:
+        # None once the cached media hold max_page_brushstrokes, the rendering then transforms its brushstrokes again
+        with self.lock:
+            if numeric_backend not in cached.page_brushstrokes and self.get_retained_page_brushstrokes() + len(cached.media.brushstrokes) > self.max_page_brushstrokes:
+                return None
+            return cached.get_page_brushstrokes(numeric_backend)
+
+    def get_view(self, media: DalmatianMedia, view: str)->DlmtView:
+        if view == "default":
+            return default_view
+        if view == "cropped":
+            return get_cropped_view(media)
+        if view not in media.views_dict:
+            raise RenderRequestError(404, "No such view: {}".format(view))
+        return media.views_dict[view]
+
+    def create_config(self, media: DalmatianMedia, params: Dict[str, str])->SvgRenderingConfig:
+        try:
+            width = int(params.get("width", ""))
+        except ValueError:
+            raise RenderRequestError(400, "Expected a width in pixels")
+        if width <= 0 or width > SERVER_MAX_WIDTH:
+            raise RenderRequestError(400, "Width out of range: {}".format(width))
+        numeric_backend = NumericBackend.from_string(params.get("numeric", "fraction"))
+        rendering_mode = SvgRenderingMode.from_string(params.get("mode", "paths"))
+        rendering_engine = SvgRenderingEngine.from_string(params.get("engine", "python"))
+        if numeric_backend == NumericBackend.NOT_SUPPORTED or rendering_mode == SvgRenderingMode.NOT_SUPPORTED or rendering_engine == SvgRenderingEngine.NOT_SUPPORTED:
+            raise RenderRequestError(400, "Numeric backend, rendering mode or engine not supported")
+        view = self.get_view(media, params.get("view", "default"))
+        return media.create_page_pixel_coordinate_with_view(width, view, numeric_backend, rendering_mode, rendering_engine, params.get("lod", "0") in ["1", "true"])
+
+    def render(self, params: Dict[str, str])->Tuple[str, bytes]:
+        # the content type and the content of the requested rendering
+        format = params.get("format", "svg")
+        if format not in SERVER_FORMATS:
+            raise RenderRequestError(400, "Format not supported: {}".format(format))
+        cached = self.get_media(self.get_filename(params.get("file", "")))
+        with cached.lock:
+            config = self.create_config(cached.media, params)
+            if format == "png":
+                from .raster import RASTER_SUPERSAMPLING, render_png
+                try:
+                    return SERVER_FORMATS[format], render_png(cached.media, config, params.get("background", "white"), int(params.get("supersampling", RASTER_SUPERSAMPLING)))
+                except ValueError as error:
+                    raise RenderRequestError(400, str(error))
+            output = io.BytesIO()
+            write_xml_svg_file(cached.media, config, output, page_brushstrokes = self.get_page_brushstrokes(cached, config.numeric_backend))
+            return SERVER_FORMATS[format], output.getvalue()
+
+    def record(self, format: str, duration: float, success: bool):
+        with self.lock:
+            self.requests += 1
+            if not success:
+                self.errors += 1
+            elif format in self.latencies:
+                self.latencies[format].append(duration)
+
+    def to_stats_obj(self):
+        with self.lock:
+            entries = list(self.media_cache.entries.values())
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "media cache": { "size": len(self.media_cache), "maxsize": self.media_cache.maxsize, "hits": self.media_cache.hits, "misses": self.media_cache.misses },
+                "page brushstrokes": { "size": self.get_retained_page_brushstrokes(), "maxsize": self.max_page_brushstrokes },
+                "transform cache": { "hits": sum([cached.media.transform_cache.hits for cached in entries]), "misses": sum([cached.media.transform_cache.misses for cached in entries]) },
+                "render cache": self.render_cache.to_obj() if self.render_cache is not None else None,
+                "latency": { name: get_latency_obj(latencies) for name, latencies in self.latencies.items() }
+            }
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    # GET /render?file=<name>.dlmt&view=i:1&width=400&format=svg, and GET /stats
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/stats":
+            self.send_content(200, "application/json", json.dumps(self.server.service.to_stats_obj(), indent = 2).encode("utf-8"))
+        elif url.path == "/render":
+            self.do_render({ name: values[-1] for name, values in parse_qs(url.query).items() })
+        else:
+            self.send_content(404, "text/plain", b"Not found")
+
+    def do_render(self, params: Dict[str, str]):
+        service = self.server.service
+        started = perf_counter()
+        format = params.get("format", "svg")
+        try:
+            content_type, content = service.render(params)
+        except RenderRequestError as error:
+            service.record(format, perf_counter() - started, False)
+            self.send_content(error.status, "text/plain", error.message.encode("utf-8"))
+            return
+        except Exception as error:
+            service.record(format, perf_counter() - started, False)
+            self.send_content(500, "text/plain", "{}: {}".format(type(error).__name__, error).encode("utf-8"))
+            return
+        duration = perf_counter() - started
+        service.record(format, duration, True)
+        self.send_content(200, content_type, content, { "Server-Timing": "render;dur={:.3f}".format(1000 * duration) })
+
+    def send_content(self, status: int, content_type: str, content: bytes, headers: Dict[str, str] = {}):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+class RenderServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], service: RenderService, verbose: bool = False):
+        super().__init__(address, RenderRequestHandler)
+        self.service = service
+        self.verbose = verbose
+
+def create_render_cache(megabytes: int, directory: str = None):
+    caches = []
+    if megabytes > 0:
+        caches.append(MemoryRenderCache(megabytes * 1024 * 1024))
+    if directory is not None:
+        caches.append(DiskRenderCache(directory))
+    if len(caches) == 0:
+        return None
+    return caches[0] if len(caches) == 1 else TieredRenderCache(caches)
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Serve renderings of Dalmatian Mask Tape media over http')
+    parser.add_argument("-i", "--indirectory", help="Directory containing the Dalmatian Mask Tape media files", required = True)
+    parser.add_argument("--host", help="Address to listen on", default = "127.0.0.1")
+    parser.add_argument("--port", help="Port to listen on", type = int, default = 8080)
+    parser.add_argument("--cache-size", help="Number of parsed media kept in memory, whose memory grows with the size of each media", type = int, default = SERVER_MEDIA_CACHE_SIZE)
+    parser.add_argument("--max-page-brushstrokes", help="Transformed brushstrokes kept for the cached media, in total, to be shared by their next renderings", type = int, default = SERVER_MAX_PAGE_BRUSHSTROKES)
+    parser.add_argument("--render-cache-size", help="Megabytes of renderings kept in memory, 0 for none", type = int, default = SERVER_RENDER_CACHE_MEGABYTES)
+    parser.add_argument("--render-cache", help="Directory where renderings are also kept, across restarts")
+    parser.add_argument("--verbose", help="Log each request", action = "store_true")
+    args = parser.parse_args()
+
+    server = RenderServer((args.host, args.port), RenderService(args.indirectory, max(args.cache_size, 1), create_render_cache(args.render_cache_size, args.render_cache), max(args.max_page_brushstrokes, 0)), args.verbose)
+    print("Serving {} on http://{}:{}/render".format(args.indirectory, *server.server_address[:2]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
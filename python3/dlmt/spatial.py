@@ -0,0 +1,88 @@
+from array import array
+from fractions import Fraction
+from math import sqrt
+from typing import Dict, Iterable, List, Tuple
+
+from .geometry import FLOAT_EDGE_MARGIN, V2d
+
+GRID_STROKES_PER_CELL = 4
+MAX_GRID_SIZE = 1024
+
+class BrushstrokeGridIndex:
+    # Uniform grid over conservative brushstroke bounding boxes, stored as floats
+    # widened by FLOAT_EDGE_MARGIN: it only ever narrows down the candidates, and any
+    # stroke that is not clearly inside a rect still gets the exact test.
+    def __init__(self, boxes: array, unbounded: List[int]):
+        self.boxes = boxes
+        self.unbounded = unbounded
+        count = len(boxes) // 4
+        if count == 0:
+            self.minx, self.miny, self.cell_width, self.cell_height, self.size = 0.0, 0.0, 1.0, 1.0, 1
+            self.cells = {}
+            return
+        self.minx = min(boxes[0::4])
+        self.miny = min(boxes[1::4])
+        maxx = max(boxes[2::4])
+        maxy = max(boxes[3::4])
+        self.size = max(1, min(MAX_GRID_SIZE, int(sqrt(count / GRID_STROKES_PER_CELL))))
+        self.cell_width = (maxx - self.minx) / self.size or 1.0
+        self.cell_height = (maxy - self.miny) / self.size or 1.0
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        for i in range(count):
+            if boxes[4*i] > boxes[4*i+2]:
+                continue
+            for cell in self.get_cells(boxes[4*i], boxes[4*i+1], boxes[4*i+2], boxes[4*i+3]):
+                self.cells.setdefault(cell, []).append(i)
+
+    @classmethod
+    def from_placements(cls, placements: Iterable[Tuple[str, float, float, Fraction]], brush_radiuses: Dict[str, Fraction], brush_page_ratio: Fraction):
+        # placements are (brushid, x, y, scale) for each brushstroke
+        boxes = array('d')
+        unbounded = []
+        extents: Dict[Tuple[str, Fraction], float] = {}
+        for i, (brushid, x, y, scale) in enumerate(placements):
+            radius = brush_radiuses.get(brushid)
+            if radius is None:
+                # unknown brush or brush without points: always a candidate, left to the exact test
+                unbounded.append(i)
+                boxes.extend([1.0, 1.0, 0.0, 0.0])
+                continue
+            extent = extents.get((brushid, scale))
+            if extent is None:
+                extent = float(radius * brush_page_ratio * abs(scale)) + FLOAT_EDGE_MARGIN
+                extents[(brushid, scale)] = extent
+            boxes.extend([x - extent, y - extent, x + extent, y + extent])
+        return cls(boxes, unbounded)
+
+    def __len__(self):
+        return len(self.boxes) // 4
+
+    def to_column(self, x: float)->int:
+        return min(self.size - 1, max(0, int((x - self.minx) / self.cell_width)))
+
+    def to_row(self, y: float)->int:
+        return min(self.size - 1, max(0, int((y - self.miny) / self.cell_height)))
+
+    def get_cells(self, minx: float, miny: float, maxx: float, maxy: float)->List[Tuple[int, int]]:
+        return [(column, row) for column in range(self.to_column(minx), self.to_column(maxx) + 1) for row in range(self.to_row(miny), self.to_row(maxy) + 1)]
+
+    def query(self, xy: V2d, width: Fraction, height: Fraction)->List[Tuple[int, bool]]:
+        # in brushstroke order, with True when the bounding box lies clearly inside the rect
+        minx, miny = float(xy.x) - FLOAT_EDGE_MARGIN, float(xy.y) - FLOAT_EDGE_MARGIN
+        maxx, maxy = float(xy.x + width) + FLOAT_EDGE_MARGIN, float(xy.y + height) + FLOAT_EDGE_MARGIN
+        candidates = set(self.unbounded)
+        for cell in self.get_cells(minx, miny, maxx, maxy):
+            candidates.update(self.cells.get(cell, []))
+        innerminx, innerminy = minx + 2*FLOAT_EDGE_MARGIN, miny + 2*FLOAT_EDGE_MARGIN
+        innermaxx, innermaxy = maxx - 2*FLOAT_EDGE_MARGIN, maxy - 2*FLOAT_EDGE_MARGIN
+        boxes = self.boxes
+        results = []
+        for i in sorted(candidates):
+            bminx, bminy, bmaxx, bmaxy = boxes[4*i], boxes[4*i+1], boxes[4*i+2], boxes[4*i+3]
+            if bminx > bmaxx:
+                results.append((i, False))
+            elif bmaxx < minx or bminx > maxx or bmaxy < miny or bminy > maxy:
+                continue
+            else:
+                results.append((i, bminx >= innerminx and bmaxx <= innermaxx and bminy >= innerminy and bmaxy <= innermaxy))
+        return results
@@ -0,0 +1,74 @@
+from fractions import Fraction
+from random import choice, sample, seed
+from typing import List, TextIO
+
+from .geometry import FractionList, V2d
+from .model import DalmatianMedia, DlmtBrush, DlmtHeaders, DlmtTagDescription, DlmtView
+
+# Valid media of any size, to measure how parsing, culling and rendering scale.
+# The same arguments and seed always give the same media.
+
+SYNTHETIC_PAGE_GRID = FractionList([Fraction(i, 1000) for i in range(0, 1000)])
+SYNTHETIC_BRUSH_GRID = FractionList([Fraction(i, 12) for i in range(1, 6)])
+SYNTHETIC_VIEW_SIZES = FractionList([Fraction(1, 10), Fraction(1, 5), Fraction(1, 4), Fraction(1, 2)])
+SYNTHETIC_SCALES = FractionList([Fraction(1, 2), Fraction(1), Fraction(3, 2), Fraction(2)])
+SYNTHETIC_ANGLES = FractionList([Fraction(i, 24) for i in range(0, 24)])
+SYNTHETIC_TAG_COMBINATIONS = 64
+
+def create_synthetic_headers(name: str)->DlmtHeaders:
+    headers = DlmtHeaders()
+    headers.set_id_urn("synthetic/{}".format(name))
+    headers.set_brush_page_ratio(Fraction(1, 100))
+    headers.set_copyright_year(2020)
+    headers.set_text("name", "en", name)
+    headers.set_text("title", "en", "synthetic media {}".format(name))
+    headers.set_text("license", "en", "No Rights Reserved (CC0)")
+    return headers
+
+def create_synthetic_brush(index: int, points: int = 5)->DlmtBrush:
+    # a closed path mixing lines, quadratic and cubic beziers
+    coordinates = SYNTHETIC_BRUSH_GRID.signed_sample_list(points * 3)
+    segments = ["M {}".format(coordinates[0])]
+    for i in range(1, points):
+        shape = (index + i) % 3
+        if shape == 0:
+            segments.append("L {}".format(coordinates[i]))
+        elif shape == 1:
+            segments.append("Q {} {}".format(coordinates[points + i], coordinates[i]))
+        else:
+            segments.append("C {} {} {}".format(coordinates[points + i], coordinates[2 * points + i], coordinates[i]))
+    segments.append("Z")
+    return DlmtBrush.from_string("brush i:{} ext-id synthetic:brush{} path [ {} ]".format(index, index, ",".join(segments)))
+
+def create_synthetic_view(index: int, tagids: List[str])->DlmtView:
+    # the first view shows the whole page, the others a part of it with a filter on a tag
+    if index == 1:
+        return DlmtView.from_string("view i:1 lang en xy 0 0 width 1 height 1 flags O tags all but [ ] -> everything")
+    width = SYNTHETIC_VIEW_SIZES.choice()
+    x, y = SYNTHETIC_PAGE_GRID.choice() * (1 - width), SYNTHETIC_PAGE_GRID.choice() * (1 - width)
+    if index % 2 == 0:
+        everything, filtered = "all", [choice(tagids)]
+    else:
+        everything, filtered = "none", sorted(sample(tagids, min(2, len(tagids))))
+    return DlmtView.from_string("view i:{} lang en xy {} {} width {} height {} flags O tags {} but [ {} ] -> view {}".format(index, x, y, width, width, everything, ", ".join(filtered), index))
+
+def create_synthetic_media(brushstrokes: int, brushes: int = 8, tags: int = 16, views: int = 4, random_seed: int = 1)->DalmatianMedia:
+    seed(random_seed)
+    tagids = ["i:{}".format(i) for i in range(1, tags + 1)]
+    media = DalmatianMedia(create_synthetic_headers("s{}".format(brushstrokes)))
+    media.set_tag_descriptions([DlmtTagDescription(id = tagid, lang = "en", description = "tag {}".format(tagid)) for tagid in tagids])
+    media.set_brushes([create_synthetic_brush(i) for i in range(1, brushes + 1)])
+    media.set_views([create_synthetic_view(i, tagids) for i in range(1, views + 1)])
+    brushids = list(media.brushes_dict.keys())
+    combinations = [sorted(sample(tagids, min(1 + i % 2, len(tagids)))) for i in range(SYNTHETIC_TAG_COMBINATIONS)]
+    store = media.brushstrokes
+    for _ in range(brushstrokes):
+        store.append_fields(choice(brushids), V2d(SYNTHETIC_PAGE_GRID.choice(), SYNTHETIC_PAGE_GRID.choice()), SYNTHETIC_SCALES.choice(), SYNTHETIC_ANGLES.choice(), choice(combinations))
+    return media.set_brushstrokes(store)
+
+def write_synthetic_media(media: DalmatianMedia, dlmtfile: TextIO):
+    # one line at a time, so that a large media is never held as a single string
+    for line in media.to_string_list(with_brushstrokes = False):
+        dlmtfile.write(line + "\n")
+    for brushstroke in media.brushstrokes:
+        dlmtfile.write(brushstroke.to_string() + "\n")
@@ -0,0 +1,76 @@
+from array import array
+from typing import Dict, Iterable, List
+
+class TagInterner:
+    # tags become bit positions, declared tags first, so that tag sets become plain integer masks
+    def __init__(self, tagids: Iterable[str] = []):
+        self.bits: Dict[str, int] = {}
+        for tagid in tagids:
+            self.intern(tagid)
+
+    def __len__(self):
+        return len(self.bits)
+
+    def intern(self, tagid: str)->int:
+        bit = self.bits.get(tagid)
+        if bit is None:
+            bit = len(self.bits)
+            self.bits[tagid] = bit
+        return bit
+
+    def to_mask(self, tagids: Iterable[str])->int:
+        mask = 0
+        for tagid in tagids:
+            mask |= 1 << self.intern(tagid)
+        return mask
+
+class ViewTagFilter:
+    # compiled form of "tags all but [...]" and "tags none but [...]"
+    def __init__(self, mask: int, everything: bool):
+        self.mask = mask
+        self.everything = everything
+
+    def accept(self, mask: int)->bool:
+        if self.everything:
+            return mask & self.mask == 0
+        else:
+            return mask & self.mask != 0
+
+class BrushstrokeTagIndex:
+    def __init__(self, interner: TagInterner, masks: List[int], postings: Dict[int, array]):
+        self.interner = interner
+        self.masks = masks
+        self.postings = postings
+
+    @classmethod
+    def from_tag_rows(cls, tagids: Iterable[str], tags: List[Iterable[str]], rows: Iterable[int]):
+        # tags lists the distinct tag combinations, rows gives the combination of each brushstroke
+        interner = TagInterner(tagids)
+        tags_masks = [interner.to_mask(tagids) for tagids in tags]
+        tags_bits = [[interner.bits[tagid] for tagid in set(tagids)] for tagids in tags]
+        masks = []
+        postings: Dict[int, array] = {}
+        for i, row in enumerate(rows):
+            masks.append(tags_masks[row])
+            for bit in tags_bits[row]:
+                posting = postings.get(bit)
+                if posting is None:
+                    posting = postings[bit] = array('l')
+                posting.append(i)
+        return cls(interner, masks, postings)
+
+    def __len__(self):
+        return len(self.masks)
+
+    def compile_view(self, view)->ViewTagFilter:
+        # view tags that no brushstroke uses get a bit too, which no mask will ever contain
+        return ViewTagFilter(self.interner.to_mask(view.tags), view.everything)
+
+    def select(self, tagfilter: ViewTagFilter)->List[int]:
+        if tagfilter.everything:
+            return [i for i, mask in enumerate(self.masks) if mask & tagfilter.mask == 0]
+        # a "none but" view only visits the strokes listed under one of its tags
+        postings = [self.postings[bit] for bit in self.interner.bits.values() if tagfilter.mask >> bit & 1 and bit in self.postings]
+        if len(postings) == 1:
+            return list(postings[0])
+        return sorted(set(i for posting in postings for i in posting))
@@ -0,0 +1,38 @@
+import re
+from typing import Dict, List
+
+def strip_string_array(rawlines: str, sep=",")->List[str]:
+    return [line.strip() for line in rawlines.split(sep) if line.strip() != ""]
+
+def parse_dlmt_array(line: str)-> List[str]:
+    return strip_string_array(line.replace("[", "").replace("]", ""), sep=",")
+
+def parse_dlmt_dict(line: str)-> Dict[str, str]:
+    return { part.split(" ")[0]:part.split(" ")[1] for part in parse_dlmt_array(line) }
+
+def to_dlmt_array(items: List[str], sep=",")->str:
+    return "[ {} ]".format(sep.join(items))
+
+def to_dlmt_dict(keyvalues: Dict[str, str], sep=",")->str:
+    return to_dlmt_array(["{} {}".format(key, value) for key, value in keyvalues.items()], sep)
+
+def strip_unknown(expected, lines):
+    return [line for line in lines if expected in line]
+
+def strip_empty(lines):
+    return [line.strip() for line in lines if len(line.strip())>0]
+
+def get_prefix(value:str)->str:
+    return value.split(":", 2)[0]
+
+PATTERN_NON_ALPHANUM = re.compile('[^a-z0-9_-]')
+
+def as_tidy_name(value: str):
+    return PATTERN_NON_ALPHANUM.sub('-', value.lower())
+
+def as_float_string(value):
+    return "{:.3f}".format(float(value))
+
+def as_exact_float_string(value):
+    # the shortest string read back as the same float, for factors whose rounding would grow with the brush size
+    return repr(float(value))
@@ -0,0 +1,148 @@
+import re
+from fractions import Fraction
+from functools import lru_cache
+from math import gcd
+from typing import List, Optional, Tuple
+
+from .text import parse_dlmt_array
+
+# Fast paths for the canonical form of each line kind, as written by to_string.
+# A line they do not match goes through the original split based parsers,
+# which remain the reference for what is accepted.
+
+NUMBER = r"(-?[0-9]+)(?:/([0-9]+))?"
+BRUSHSTROKE_PATTERN = re.compile(r"brushstroke (\S+) xy {0} {0} scale {0} angle {0} tags (.*)".format(NUMBER), re.ASCII)
+# a view has exactly one '->', so none of its fields may hold one
+VIEW_FIELD = r"((?:(?!->)\S)+)"
+VIEW_PATTERN = re.compile(r"view {0} lang {0} xy {0} {0} width {0} height {0} flags {0} tags {0} but ((?:(?!->).)*)->((?:(?!->).)*)".format(VIEW_FIELD), re.ASCII)
+BRUSH_PATTERN = re.compile(r"brush (\S+) ext-id (\S+) path (.*)", re.ASCII)
+SEGMENT_PATTERN = re.compile(r"([MLTSQC])((?: -?[0-9]+(?:/[0-9]+)?)+)", re.ASCII)
+SEGMENT_POINT_COUNTS = { "M": 1, "L": 1, "T": 1, "S": 2, "Q": 2, "C": 3 }
+TAGS_CACHE_SIZE = 4096
+
+ID = "an id"
+NUMBER_TOKEN = "a number"
+REST = "the rest of the line"
+BRUSHSTROKE_GRAMMAR = ["brushstroke", ID, "xy", NUMBER_TOKEN, NUMBER_TOKEN, "scale", NUMBER_TOKEN, "angle", NUMBER_TOKEN, "tags", REST]
+VIEW_GRAMMAR = ["view", ID, "lang", ID, "xy", NUMBER_TOKEN, NUMBER_TOKEN, "width", NUMBER_TOKEN, "height", NUMBER_TOKEN, "flags", ID, "tags", ID, "but", REST]
+BRUSH_GRAMMAR = ["brush", ID, "ext-id", ID, "path", REST]
+
+class DlmtSyntaxError(ValueError):
+    def __init__(self, message: str, line: str, column: int = 0, line_number: int = None):
+        self.message = message
+        self.line = line
+        self.column = column
+        self.line_number = line_number
+        super().__init__(self.to_string())
+
+    def to_string(self)->str:
+        # columns and line numbers are reported from 1, like editors do
+        if self.line_number is None:
+            position = "column {}".format(self.column + 1)
+        else:
+            position = "line {}, column {}".format(self.line_number, self.column + 1)
+        return "{} at {}: {}".format(self.message, position, self.line)
+
+    def set_line_number(self, line_number: int):
+        self.line_number = line_number
+        self.args = (self.to_string(),)
+        return self
+
+def to_ratio(numerator: str, denominator: str)->Optional[Tuple[int, int]]:
+    # normalised like Fraction, without creating one
+    n = int(numerator)
+    d = 1 if denominator is None else int(denominator)
+    if d == 0:
+        return None
+    g = gcd(n, d)
+    return n // g, d // g
+
+def to_fraction(numerator: str, denominator: str)->Optional[Fraction]:
+    if denominator is None:
+        return Fraction(int(numerator))
+    d = int(denominator)
+    if d == 0:
+        return None
+    return Fraction(int(numerator), d)
+
+@lru_cache(maxsize = TAGS_CACHE_SIZE)
+def parse_tags(info: str)->Tuple[str, ...]:
+    return tuple(parse_dlmt_array(info))
+
+def match_brushstroke(line: str)->Optional[Tuple[str, List[Tuple[int, int]], Tuple[str, ...]]]:
+    # brush id, ratios of x, y, scale and angle, tags
+    matched = BRUSHSTROKE_PATTERN.fullmatch(line)
+    if matched is None:
+        return None
+    groups = matched.groups()
+    ratios = [to_ratio(groups[1 + 2*k], groups[2 + 2*k]) for k in range(4)]
+    if None in ratios:
+        return None
+    return groups[0], ratios, parse_tags(groups[9])
+
+def match_view(line: str)->Optional[Tuple[str, ...]]:
+    # the fields of DlmtView.split_string, as strings
+    matched = VIEW_PATTERN.fullmatch(line)
+    if matched is None:
+        return None
+    return matched.groups()
+
+def match_brush(line: str)->Optional[Tuple[str, str, str]]:
+    matched = BRUSH_PATTERN.fullmatch(line)
+    if matched is None:
+        return None
+    return matched.groups()
+
+def match_segment(dstr: str)->Optional[Tuple[str, List[Fraction]]]:
+    matched = SEGMENT_PATTERN.fullmatch(dstr)
+    if matched is None:
+        return None
+    action = matched.group(1)
+    values = matched.group(2)[1:].split(" ")
+    if len(values) != 2 * SEGMENT_POINT_COUNTS[action]:
+        return None
+    fractions = []
+    for value in values:
+        numerator, _, denominator = value.partition("/")
+        fraction = to_fraction(numerator, denominator or None)
+        if fraction is None:
+            return None
+        fractions.append(fraction)
+    return action, fractions
+
+def is_number(token: str)->bool:
+    try:
+        Fraction(token)
+        return True
+    except (ValueError, ZeroDivisionError):
+        return False
+
+def find_error_column(line: str, grammar: List[str])->Tuple[int, str]:
+    # column of the first token the grammar does not accept, with what was expected there
+    tokens = line.split(" ")
+    column = 0
+    for index, expected in enumerate(grammar):
+        if expected == REST:
+            return column, "Unexpected {}".format(REST)
+        if index >= len(tokens):
+            return len(line), "Expected {}".format(expected if expected in [ID, NUMBER_TOKEN] else "'{}'".format(expected))
+        token = tokens[index]
+        if expected == NUMBER_TOKEN and not is_number(token):
+            return column, "Expected {}".format(NUMBER_TOKEN)
+        if expected not in [ID, NUMBER_TOKEN] and token != expected:
+            return column, "Expected '{}'".format(expected)
+        column += len(token) + 1
+    return min(column, len(line)), "Unexpected {}".format(REST)
+
+def to_syntax_error(line: str, grammar: List[str], kind: str)->DlmtSyntaxError:
+    column, message = find_error_column(line, grammar)
+    return DlmtSyntaxError("Invalid {}: {}".format(kind, message), line, column)
+
+def to_view_syntax_error(line: str)->DlmtSyntaxError:
+    separators = line.count("->")
+    if separators == 0:
+        return DlmtSyntaxError("Invalid view: Expected '->' before the description", line, len(line))
+    if separators > 1:
+        return DlmtSyntaxError("Invalid view: Unexpected second '->'", line, line.index("->", line.index("->") + 2))
+    column, message = find_error_column(line.split("->")[0], VIEW_GRAMMAR)
+    return DlmtSyntaxError("Invalid view: {}".format(message), line, column)
@@ -0,0 +1,122 @@
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .geometry import NumericBackend, SegmentShape, V2d, VPath, rotation_matrix
+from .metrics import timer
+from .model import DalmatianMedia
+
+VECTORIZED_CHUNK_SIZE = 4096
+# coordinates are written with 3 decimals, so values are compared in thousandths of a pixel
+SVG_DECIMALS_SCALE = 1000
+ROUNDING_TOLERANCE = 1e-6
+RELATIVE_ROUNDING_TOLERANCE = 1e-12
+
+def is_available()->bool:
+    return numpy is not None
+
+def get_ordered_points(vpath: VPath)->Tuple[str, List[V2d]]:
+    # same layout as VPath.to_svg_string, with a placeholder for each coordinate
+    parts = []
+    points = []
+    for segment in vpath.segments:
+        action = segment.action
+        action_str = SegmentShape.to_string(action)
+        if action == SegmentShape.CLOSE_PATH:
+            parts.append(action_str)
+            continue
+        if action in [SegmentShape.MOVE_TO, SegmentShape.LINE_TO, SegmentShape.FLUID_BEZIER]:
+            segment_points = [segment.pt]
+        elif action in [SegmentShape.SMOOTH_BEZIER, SegmentShape.QUADRATIC_BEZIER]:
+            segment_points = [segment.pt1, segment.pt]
+        elif action == SegmentShape.CUBIC_BEZIER:
+            segment_points = [segment.pt1, segment.pt2, segment.pt]
+        else:
+            parts.append("E")
+            continue
+        parts.append(" ".join([action_str] + ["%.3f %.3f"] * len(segment_points)))
+        points += segment_points
+    return " ".join(parts), points
+
+class BrushMatrix:
+    def __init__(self, vpath: VPath):
+        self.template, points = get_ordered_points(vpath)
+        self.xs = numpy.array([float(pt.x) for pt in points], dtype = numpy.float64)
+        self.ys = numpy.array([float(pt.y) for pt in points], dtype = numpy.float64)
+
+def get_ambiguous_rows(values)->"numpy.ndarray":
+    # rows with a value close to a rounding boundary of the 3 decimals, or close enough to 0 for the sign to be unsure
+    scaled = numpy.abs(values) * SVG_DECIMALS_SCALE
+    tolerance = ROUNDING_TOLERANCE + scaled * RELATIVE_ROUNDING_TOLERANCE
+    fraction = scaled - numpy.floor(scaled)
+    ambiguous = (numpy.abs(fraction - 0.5) <= tolerance) | (scaled <= tolerance)
+    return ambiguous.any(axis = 1)
+
+def to_svg_path_data(media: DalmatianMedia, renderConfig, i: int)->str:
+    # the pure python path is the reference for the numeric backend of the config
+    numeric_backend = renderConfig.numeric_backend
+    view = renderConfig.view
+    pbs = media.to_page_brushstroke_at(i, numeric_backend).zoom_to(view.xy.to_backend(numeric_backend), NumericBackend.to_number(numeric_backend, view.width))
+    return pbs.vpath.to_svg_string(float(renderConfig.view_pixel_width), float(renderConfig.view_pixel_height))
+
+def render_chunk(media: DalmatianMedia, renderConfig, indexes: List[int], brush_matrices: Dict[str, BrushMatrix])->List[str]:
+    store = media.brushstrokes
+    view = renderConfig.view
+    brush_page_ratio = float(media.headers.brush_page_ratio)
+    dpu = float(renderConfig.view_pixel_width) / float(view.width)
+    ypixoffset = float(renderConfig.view_pixel_height)
+    viewx, viewy = float(view.xy.x), float(view.xy.y)
+    results: List[str] = [None] * len(indexes)
+    groups: Dict[str, List[int]] = {}
+    for position, i in enumerate(indexes):
+        groups.setdefault(store.get_brushid(i), []).append(position)
+    for brushid, positions in groups.items():
+        brush = media.get_brush_by_id(brushid)
+        if brush is None:
+            continue
+        if brushid not in brush_matrices:
+            brush_matrices[brushid] = BrushMatrix(brush.vpath)
+        matrix = brush_matrices[brushid]
+        if len(matrix.xs) == 0:
+            continue
+        rows = [indexes[position] for position in positions]
+        trigonometry = numpy.array([rotation_matrix(store.get_angle(i), NumericBackend.FLOAT) for i in rows], dtype = numpy.float64)
+        cosa = trigonometry[:, 0:1]
+        sina = trigonometry[:, 1:2]
+        scale = numpy.array([store.scales.to_float(i) for i in rows], dtype = numpy.float64)[:, None] * brush_page_ratio
+        tx = numpy.array([store.xs.to_float(i) for i in rows], dtype = numpy.float64)[:, None]
+        ty = numpy.array([store.ys.to_float(i) for i in rows], dtype = numpy.float64)[:, None]
+        xs = ((matrix.xs * cosa - matrix.ys * sina) * scale + tx - viewx) * dpu
+        ys = ypixoffset - ((matrix.xs * sina + matrix.ys * cosa) * scale + ty - viewy) * dpu
+        ambiguous = get_ambiguous_rows(xs) | get_ambiguous_rows(ys)
+        coordinates = numpy.empty((len(rows), 2 * len(matrix.xs)), dtype = numpy.float64)
+        coordinates[:, 0::2] = xs
+        coordinates[:, 1::2] = ys
+        for position, values, unsure in zip(positions, coordinates.tolist(), ambiguous.tolist()):
+            if not unsure:
+                results[position] = matrix.template % tuple(values)
+    for position, i in enumerate(indexes):
+        if results[position] is None:
+            results[position] = to_svg_path_data(media, renderConfig, i)
+    return results
+
+def iter_svg_path_data(media: DalmatianMedia, renderConfig, indexes: Iterable[int])->Iterator[str]:
+    # the "d" attribute of each brushstroke, in the order of the indexes, computed a chunk at a time
+    assert is_available(), "NumPy is not installed"
+    brush_matrices: Dict[str, BrushMatrix] = {}
+    chunk = []
+    for i in indexes:
+        chunk.append(i)
+        if len(chunk) >= VECTORIZED_CHUNK_SIZE:
+            with timer(media.metrics, "transform"):
+                results = render_chunk(media, renderConfig, chunk, brush_matrices)
+            for data in results:
+                yield data
+            chunk = []
+    with timer(media.metrics, "transform"):
+        results = render_chunk(media, renderConfig, chunk, brush_matrices)
+    for data in results:
+        yield data
@@ -0,0 +1,8 @@
+from dlmt import check_python_version
+
+check_python_version()
+
+from dlmt.server import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import io
+import os
+import sys
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dlmt.binary import media_from_binary, media_to_binary
+from dlmt.model import DalmatianMedia, DlmtBrush, DlmtBrushstroke, DlmtView, default_view
+from dlmt.renderer import SvgRenderingEngine
+from dlmt.synthetic import create_synthetic_media
+from dlmt.tokenizer import DlmtSyntaxError, match_brush, match_brushstroke, match_view
+
+# The fast paths added for performance are checked against the code they replace,
+# which remains the reference for what is parsed, rendered and selected.
+
+def create_media()->DalmatianMedia:
+    return create_synthetic_media(300, brushes = 4, tags = 6, views = 3, random_seed = 7)
+
+def render_views(media: DalmatianMedia, engine: SvgRenderingEngine, width: int = 500):
+    configs = [media.create_page_pixel_coordinate_with_view(width, view) for view in media.get_sorted_views() + [default_view]]
+    for config in configs:
+        config.rendering_engine = engine
+    outputs = [io.BytesIO() for _ in configs]
+    media.to_xml_svg_files(configs, outputs)
+    return [output.getvalue() for output in outputs]
+
+class TestTokenizer(unittest.TestCase):
+    def test_brushstrokes_match_the_split_parser(self):
+        for bs in create_media().brushstrokes:
+            line = bs.to_string()
+            self.assertIsNotNone(match_brushstroke(line))
+            self.assertEqual([str(field) for field in DlmtBrushstroke.parse_string(line)], [str(field) for field in DlmtBrushstroke.split_string(line)])
+
+    def test_views_match_the_split_parser(self):
+        for view in create_media().get_sorted_views():
+            line = view.to_string()
+            self.assertEqual(match_view(line), DlmtView.split_string(line))
+
+    def test_brushes_match_the_split_parser(self):
+        for brush in create_media().brushes_dict.values():
+            line = brush.to_string()
+            self.assertEqual(match_brush(line), DlmtBrush.split_string(line))
+
+    def test_view_with_two_arrows_is_rejected(self):
+        line = "view i->1 lang en xy 0 0 width 1 height 1 flags O tags all but [] -> d"
+        self.assertIsNone(match_view(line))
+        with self.assertRaises(DlmtSyntaxError):
+            DlmtView.from_string(line)
+
+    def test_fractions_are_normalised_like_the_split_parser(self):
+        line = "brushstroke i:1 xy 2/4 -3/6 scale 4/2 angle 0/5 tags [ i:1 ]"
+        self.assertEqual([str(field) for field in DlmtBrushstroke.parse_string(line)], [str(field) for field in DlmtBrushstroke.split_string(line)])
+
+class TestRenderingEngines(unittest.TestCase):
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_numpy_svg_is_the_python_svg(self):
+        media = create_media()
+        self.assertEqual(render_views(media, SvgRenderingEngine.NUMPY), render_views(media, SvgRenderingEngine.PYTHON))
+
+class TestBinary(unittest.TestCase):
+    def test_round_trip(self):
+        media = create_media()
+        self.assertEqual(media_from_binary(media_to_binary(media)).to_string(), media.to_string())
+
+    def test_round_trip_renders_the_same(self):
+        media = create_media()
+        self.assertEqual(render_views(media_from_binary(media_to_binary(media)), SvgRenderingEngine.PYTHON), render_views(media, SvgRenderingEngine.PYTHON))
+
+class TestSpatialIndex(unittest.TestCase):
+    def test_index_selects_like_a_full_scan(self):
+        media = create_media()
+        brushstrokes = list(media.brushstrokes)
+        for view in media.get_sorted_views() + [default_view]:
+            indexed = [bs.to_string() for bs in media.iter_brushstrokes_for_view(view)]
+            scanned = [bs.to_string() for bs in media.iter_brushstrokes_for_view(view, brushstrokes = brushstrokes)]
+            self.assertEqual(indexed, scanned)
+
+class TestSectionSeparators(unittest.TestCase):
+    def test_indented_separators_and_blank_lines(self):
+        content = create_media().to_string()
+        spaced = "\n\n".join(["  {}  ".format(line) for line in content.splitlines()])
+        self.assertEqual(DalmatianMedia.from_string(spaced).to_string(), content)
+
+    def test_separator_with_trailing_text_is_rejected(self):
+        content = create_media().to_string().replace("--------", "-------- x", 1)
+        with self.assertRaises(DlmtSyntaxError):
+            DalmatianMedia.from_string(content)
+
+    def test_repeated_separator_is_rejected(self):
+        content = create_media().to_string().replace("--------", "--------\n--------", 1)
+        with self.assertRaises(DlmtSyntaxError):
+            DalmatianMedia.from_string(content)
+
+if __name__ == '__main__':
+    unittest.main()